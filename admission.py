@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+# ==========================================================
+# কনফিগারেশন
+# ==========================================================
+# প্রতি ইউজার: একসাথে সর্বোচ্চ কয়টি প্রশ্ন (burst) এবং প্রতি মিনিটে কয়টি নতুন প্রশ্নের অনুমতি
+AI_USER_BURST = float(os.getenv("AI_USER_BURST", "3"))
+AI_USER_PER_MINUTE = float(os.getenv("AI_USER_PER_MINUTE", "6"))
+# সব ইউজার মিলিয়ে একসাথে কয়টি AI কল এবং প্রতি সেকেন্ডে কয়টি
+AI_MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT", os.getenv("GEMINI_MAX_WORKERS", "8")))
+AI_MAX_QPS = float(os.getenv("AI_MAX_QPS", "5"))
+# সিস্টেম ব্যস্ত থাকলে কয়টি প্রশ্ন অপেক্ষা করতে পারবে, এবং সর্বোচ্চ কতক্ষণ (সেকেন্ড)
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "8"))
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "10"))
+# কতজন ইউজারের token bucket মেমোরিতে রাখা হবে
+AI_MAX_TRACKED_USERS = int(os.getenv("AI_MAX_TRACKED_USERS", "10000"))
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        # rate: প্রতি সেকেন্ডে কয়টি টোকেন যোগ হয়
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount=1.0):
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def retry_after(self, amount=1.0):
+        self._refill()
+        if self.tokens >= amount or self.rate <= 0:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+class Admission:
+    def __init__(self, ok, reason=None, retry_after=0.0):
+        self.ok = ok
+        # None, "rate_limited" (এই ইউজার খুব দ্রুত) অথবা "busy" (পুরো সিস্টেম ব্যস্ত)
+        self.reason = reason
+        self.retry_after = retry_after
+
+# ==========================================================
+# AI কলের আগে admission control: per-user token bucket,
+# global concurrency + QPS সীমা, এবং সীমিত FIFO অপেক্ষার সারি।
+# ডেটা কমান্ড (/bus, /weekly_routine ...) এখানে আসে না; তাদের অগ্রাধিকার update_processor.py
+# এর TrackedUpdateProcessor এ (সংরক্ষিত স্লট এবং সারিতে AI টেক্সটের আগে)
+# ==========================================================
+class AdmissionController:
+    def __init__(self, max_concurrent=AI_MAX_CONCURRENT, max_qps=AI_MAX_QPS, max_queue=AI_MAX_QUEUE,
+                 queue_timeout=AI_QUEUE_TIMEOUT, user_burst=AI_USER_BURST, user_per_minute=AI_USER_PER_MINUTE):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.user_burst = user_burst
+        self.user_rate = user_per_minute / 60.0
+        self._qps = TokenBucket(max_qps, max(1.0, max_qps))
+        self._users = OrderedDict()
+        self._active = 0
+        self._waiters = deque()
+        self.stats = {'admitted': 0, 'rate_limited': 0, 'busy': 0}
+
+    def _user_bucket(self, user_id):
+        bucket = self._users.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+            self._users[user_id] = bucket
+            if len(self._users) > AI_MAX_TRACKED_USERS:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return bucket
+
+    async def _acquire_slot(self):
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return True
+        # সারি ভরা থাকলে অপেক্ষা না করিয়ে সাথে সাথে "ব্যস্ত" উত্তর
+        if len(self._waiters) >= self.max_queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() স্লটটি সরাসরি এই অপেক্ষমাণকে দিয়ে দেয়
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # স্লট পাওয়ার পরপরই cancel হলে স্লটটি পরের জনকে দিয়ে দেওয়া
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            # সময় শেষ/cancel হওয়া অপেক্ষমাণকে সারি থেকে সরানো, নাহলে release() পর্যন্ত
+            # সে max_queue এর জায়গা নেয় আর fast path আটকে রাখে
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self._active -= 1
+
+    async def acquire(self, user_id):
+        bucket = self._user_bucket(user_id)
+        if not bucket.try_take():
+            self.stats['rate_limited'] += 1
+            return Admission(False, "rate_limited", bucket.retry_after())
+
+        if not await self._acquire_slot():
+            # এই প্রশ্নটি চলেনি, তাই ইউজারের টোকেন ফেরত
+            bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+            self.stats['busy'] += 1
+            return Admission(False, "busy", 1.0 / self._qps.rate if self._qps.rate else self.queue_timeout)
+
+        # স্লট পাওয়ার পরও সেকেন্ডে কয়টি কল যাবে তার সীমা
+        try:
+            while not self._qps.try_take():
+                await asyncio.sleep(self._qps.retry_after())
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        self.stats['admitted'] += 1
+        return Admission(True)
+
+    @asynccontextmanager
+    async def admit(self, user_id):
+        admission = await self.acquire(user_id)
+        try:
+            yield admission
+        finally:
+            if admission.ok:
+                self.release()
+
+    def snapshot(self):
+        return dict(self.stats, active=self._active, waiting=len(self._waiters))
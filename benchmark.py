@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+from telegram import Update
+import data_store
+import metrics
+from fake_telegram import FakeTelegramRequest
+from reply_cache import get_cache_stats
+from retrieval import get_prompt_stats
+from routine_data_manager import get_batch_views
+
+# ==========================================================
+# অফলাইন লোড-টেস্ট: main.py এর আসল হ্যান্ডলারগুলো কৃত্রিম Update দিয়ে চালানো হয়।
+# টেলিগ্রামের বদলে FakeTelegramRequest, Gemini এর বদলে স্টাব মডেল।
+#
+#   python benchmark.py --users 200 --requests 20
+#   python benchmark.py --batches 3000 --routes 2000 --gemini-latency 0.02
+#
+# main.py আর gemini_qa.py ইমপোর্টের সময় কনফিগারেশন পড়ে, তাই সেগুলো configure() এর পরে
+# (main_async / run এর ভেতরে) ইমপোর্ট হয়; টেস্ট থেকে run_load() সরাসরি ডাকা যায়
+# ==========================================================
+
+DAYS = ['শনিবার', 'রবিবার', 'সোমবার', 'মঙ্গলবার', 'বুধবার', 'বৃহস্পতিবার']
+SLOTS = ['08:00 AM', '09:15 AM', '10:30 AM', '11:45 AM', '01:00 PM', '02:15 PM', '03:30 PM', '04:45 PM']
+
+DEFAULT_MIX = {
+    'class_current': 20,
+    'class_next': 10,
+    'weekly_routine': 15,
+    'bus': 20,
+    'faculty_info_cse': 10,
+    'course_info': 10,
+    'text': 15,
+    'set_batch': 5,
+}
+
+QUESTIONS = [
+    "আজ কি ক্লাস আছে?",
+    "next bus to campus",
+    "who teaches OS?",
+    "রবিবার কোন রুমে ক্লাস?",
+]
+
+# ==========================================================
+# বড় কৃত্রিম ডেটাসেট (হাজার হাজার ব্যাচ ও বাস রুট)
+# ==========================================================
+def generate_dataset(path, batches=1000, routes=500, faculty=300, courses=400, seed=1, keep_batch=None):
+    rng = random.Random(seed)
+    os.makedirs(path, exist_ok=True)
+
+    initials = []
+    seen = set()
+    while len(initials) < faculty:
+        initial = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+        if initial not in seen:
+            seen.add(initial)
+            initials.append(initial)
+    faculty_info = {initial: f"Faculty Member {i}" for i, initial in enumerate(initials)}
+    course_info = {f"C{i}": f"Synthetic Course {i}" for i in range(courses)}
+    codes = list(course_info)
+
+    batch_names = [f"CSE-{40 + i // 26}{chr(65 + i % 26)}" for i in range(batches)]
+    if keep_batch and keep_batch not in batch_names:
+        batch_names[0] = keep_batch
+    routine = []
+    for batch in batch_names:
+        for day in rng.sample(DAYS, 4):
+            start = rng.randrange(0, len(SLOTS) - 3)
+            for slot in range(start, start + 3):
+                routine.append({
+                    "day": day,
+                    "batch": batch,
+                    "start_time": SLOTS[slot],
+                    "end_time": SLOTS[slot + 1],
+                    "course_code": rng.choice(codes),
+                    "room": str(rng.randrange(100, 600)),
+                    "faculty_initial": rng.choice(initials),
+                })
+
+    stops = [f"Stop {i}" for i in range(max(20, routes * 2))]
+    bus_info = []
+    for i in range(routes):
+        route_stops = rng.sample(stops, rng.randrange(4, 10)) + ["Campus"]
+        hour = rng.randrange(7, 18)
+        bus_info.append({
+            "route_name": route_stops[0],
+            "bus_no": f"11-{1000 + i}",
+            "bus_type": "Student",
+            "departure_time": f"{(hour % 12) or 12:02d}:{rng.choice(['00', '15', '30', '45'])} {'PM' if hour >= 12 else 'AM'}",
+            "arrival_time": "",
+            "departure_location": route_stops[0],
+            "arrival_location": "Campus",
+            "route_details": " -> ".join(route_stops),
+            "comment": "",
+        })
+
+    for name, data in (('routine_data.json', routine), ('course_info.json', course_info),
+                       ('faculty_info.json', faculty_info), ('bus_info.json', bus_info)):
+        with open(os.path.join(path, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    return {'routine': len(routine), 'batches': len(batch_names), 'routes': len(bus_info)}
+
+# ==========================================================
+# কৃত্রিম Update
+# ==========================================================
+_update_ids = iter(range(1, 10 ** 9))
+
+def make_update(bot, user_id, text):
+    message = {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        "text": text,
+    }
+    if text.startswith('/'):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return Update.de_json({"update_id": message["message_id"], "message": message}, bot)
+
+def make_text(kind, snapshot, rng):
+    if kind == 'bus':
+        bus = rng.choice(snapshot.bus) if snapshot.bus else {}
+        stops = [s.strip() for s in bus.get('route_details', '').split('->') if s.strip()]
+        return f"/bus {rng.choice(stops)}" if stops else "/bus"
+    if kind == 'faculty_info_cse':
+        return f"/faculty_info_cse {rng.choice(list(snapshot.faculty) or ['NIR'])}"
+    if kind == 'course_info':
+        return f"/course_info {rng.choice(list(snapshot.courses) or ['OOP']).split()[0]}"
+    if kind == 'text':
+        return rng.choice(QUESTIONS)
+    if kind == 'set_batch':
+        batches = get_batch_views(snapshot)['sorted']
+        return f"/set_batch {rng.choice(batches)}" if batches else "/set_batch"
+    return f"/{kind}"
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+# ==========================================================
+# লোড চালানো
+# ==========================================================
+async def run_load(application, users, requests_per_user, mix, seed=1):
+    snapshot = data_store.get_snapshot()
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    # process_update হ্যান্ডলারের exception গিলে error handler এ পাঠায়, তাই ভুল সেখানেই গোনা হয়
+    kind_of = {}
+
+    async def count_error(update, context):
+        errors[kind_of.get(getattr(update, 'update_id', None), 'unknown')] += 1
+
+    application.add_error_handler(count_error)
+    processor = application.update_processor
+
+    async def simulate_user(user_id):
+        rng = random.Random(seed * 100003 + user_id)
+        for _ in range(requests_per_user):
+            kind = rng.choices(kinds, weights)[0]
+            update = make_update(application.bot, user_id, make_text(kind, snapshot, rng))
+            kind_of[update.update_id] = kind
+            started = time.perf_counter()
+            # আসল রানের মতো update processor (CONCURRENT_UPDATES এর স্লট) দিয়ে, তাই স্লটের অপেক্ষাও মাপা হয়
+            await processor.process_update(update, application.process_update(update))
+            latencies[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(simulate_user(100000 + i) for i in range(users)))
+    finally:
+        application.remove_error_handler(count_error)
+    return latencies, errors, time.perf_counter() - started
+
+def report(latencies, errors, elapsed, out=sys.stdout):
+    total = sum(len(values) for values in latencies.values())
+    print(f"\n{total} requests in {elapsed:.2f}s -> {total / elapsed if elapsed else 0:.1f} req/s", file=out)
+    print("latency = wait for a concurrent-update slot + handler time (Telegram fetch/webhook not included)", file=out)
+    print(f"{'command':<18}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}", file=out)
+    for kind in sorted(latencies):
+        values = sorted(latencies[kind])
+        print(
+            f"{kind:<18}{len(values):>7}{len(values) / elapsed if elapsed else 0:>9.1f}"
+            f"{percentile(values, 0.50) * 1000:>9.2f}{percentile(values, 0.95) * 1000:>9.2f}"
+            f"{percentile(values, 0.99) * 1000:>9.2f}{values[-1] * 1000:>9.2f}{errors[kind]:>8}",
+            file=out,
+        )
+
+async def main_async(args):
+    import main
+    from gemini_qa import get_answer_cache_stats
+
+    request = FakeTelegramRequest(latency=args.telegram_latency)
+    application = main.build_application(request, FakeTelegramRequest(), token="0:benchmark")
+    async with application:
+        latencies, errors, elapsed = await run_load(application, args.users, args.requests, DEFAULT_MIX, seed=args.seed)
+    report(latencies, errors, elapsed)
+    print(f"\nTelegram API calls: {request.calls}")
+    print(f"Reply cache: {get_cache_stats()}")
+    print(f"Gemini answer cache: {get_answer_cache_stats()}")
+    print(f"Prompt sizes: {get_prompt_stats()}")
+    print(f"AI admission: {main.ai_admission.snapshot()}")
+    if args.metrics:
+        print("\n" + metrics.render())
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test for MetroMate handlers")
+    parser.add_argument('--users', type=int, default=50, help="simulated concurrent users")
+    parser.add_argument('--requests', type=int, default=20, help="requests per user")
+    parser.add_argument('--telegram-latency', type=float, default=0.0, help="fake Bot API latency per call (s)")
+    parser.add_argument('--gemini-latency', type=float, default=0.01, help="stub Gemini delay per streamed chunk (s)")
+    parser.add_argument('--batches', type=int, default=0, help="generate a synthetic dataset with this many batches (0 = use data/)")
+    parser.add_argument('--routes', type=int, default=500, help="bus routes in the synthetic dataset")
+    parser.add_argument('--keep-ai-limits', action='store_true', help="keep the per-user AI rate limits during the run")
+    parser.add_argument('--metrics', action='store_true', help="print the Prometheus metrics after the run")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+def configure(args):
+    # হ্যান্ডলার মডিউল ইমপোর্টের আগেই কনফিগারেশন সেট করতে হবে
+    workdir = tempfile.mkdtemp(prefix="metromate-bench-")
+    os.environ['STATE_DB'] = os.path.join(workdir, 'bot_state.db')
+    os.environ['GEMINI_STUB'] = '1'
+    os.environ['GEMINI_STUB_DELAY'] = str(args.gemini_latency)
+    if not args.keep_ai_limits:
+        os.environ.setdefault('AI_USER_BURST', '1000000')
+        os.environ.setdefault('AI_USER_PER_MINUTE', '1000000')
+        os.environ.setdefault('AI_MAX_QPS', '1000000')
+    return workdir
+
+def run(args):
+    workdir = configure(args)
+    import main
+
+    if args.batches:
+        data_dir = os.path.join(workdir, 'data')
+        sizes = generate_dataset(data_dir, batches=args.batches, routes=args.routes, seed=args.seed, keep_batch=main.DEFAULT_BATCH)
+        data_store.use_data_dir(data_dir)
+        print(f"Synthetic dataset: {sizes}")
+    asyncio.run(main_async(args))
+
+if __name__ == '__main__':
+    run(parse_args())
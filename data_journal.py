@@ -0,0 +1,113 @@
+import os
+import json
+import logging
+import threading
+import data_store
+
+logger = logging.getLogger(__name__)
+
+# এতগুলো অপারেশন জমলে সাথে সাথে কম্প্যাকশন
+JOURNAL_COMPACT_OPS = int(os.getenv("JOURNAL_COMPACT_OPS", "100"))
+# প্রথম অপারেশনের এতক্ষণ (সেকেন্ড) পর কম্প্যাকশন
+JOURNAL_COMPACT_DELAY = float(os.getenv("JOURNAL_COMPACT_DELAY", "10"))
+
+_lock = threading.Lock()
+_compact_lock = threading.Lock()
+_pending_ops = 0
+_dirty = set()
+_timer = None
+
+# ==========================================================
+# জার্নালে লেখা: একটি লাইন (বা ব্যাচ) append + fsync, তারপর মেমোরিতে প্রয়োগ
+# ==========================================================
+def record(ops):
+    global _pending_ops
+    if not ops:
+        return data_store.get_snapshot()
+    lines = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+    with _lock:
+        with open(data_store.journal_path(), 'ab+') as f:
+            # ক্র্যাশে অর্ধেক লেখা শেষ লাইন থাকলে নতুন লাইন থেকে শুরু
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines = "\n" + lines
+            f.write(lines.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        snapshot = data_store.commit_ops(ops)
+        _pending_ops += len(ops)
+        _dirty.update(data_store.OP_TARGETS[op['op']] for op in ops)
+        compact_now = _pending_ops >= JOURNAL_COMPACT_OPS
+        if not compact_now:
+            _schedule()
+    if compact_now:
+        threading.Thread(target=compact, name="journal-compact", daemon=True).start()
+    return snapshot
+
+def _schedule():
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(JOURNAL_COMPACT_DELAY, compact)
+        _timer.daemon = True
+        _timer.start()
+
+# ==========================================================
+# কম্প্যাকশন: JSON স্ন্যাপশট ফাইলে লিখে জার্নাল খালি করা
+# ==========================================================
+def write_atomic(path, data):
+    # আগে অস্থায়ী ফাইলে পুরোটা লিখে তারপর rename, তাই ক্র্যাশে অর্ধেক ফাইল থাকে না
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def compact():
+    global _pending_ops, _timer
+    with _compact_lock:
+        with _lock:
+            _timer = None
+            if not _dirty:
+                # আগের রান থেকে থেকে যাওয়া জার্নাল (যেমন ক্র্যাশের পর)
+                _dirty.update(data_store.OP_TARGETS[op['op']] for op in data_store.read_journal() if op.get('op') in data_store.OP_TARGETS)
+            if not _dirty:
+                return False
+            # এই মুহূর্তের স্ন্যাপশটে জার্নালের সব অপারেশন আছে; জার্নাল সরিয়ে নতুনটা শুরু
+            snapshot = data_store.get_snapshot()
+            names = set(_dirty)
+            _dirty.clear()
+            _pending_ops = 0
+            journal = data_store.journal_path()
+            compacting = data_store.journal_path('.compacting')
+            if os.path.exists(journal) and os.path.exists(compacting):
+                # আগের ব্যর্থ কম্প্যাকশনের জার্নাল এখনো আছে, তার সাথে জুড়ে দেওয়া
+                with open(journal, 'rb') as src, open(compacting, 'ab') as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(journal)
+            elif os.path.exists(journal):
+                os.replace(journal, compacting)
+
+        try:
+            for name in names:
+                write_atomic(data_store.data_path(name), getattr(snapshot, name))
+            data_store.mark_synced()
+        except OSError as e:
+            # সরানো জার্নালটি থেকে যায়, পরের লোডে আবার প্রয়োগ হবে
+            logger.error("Journal compaction failed: %s", e)
+            with _lock:
+                _dirty.update(names)
+                _schedule()
+            return False
+
+        if os.path.exists(compacting):
+            os.remove(compacting)
+        logger.info("Compacted journal into %s", ", ".join(sorted(names)))
+        return True
+
+def pending():
+    with _lock:
+        return _pending_ops
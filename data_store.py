@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import threading
+from collections import namedtuple
+
+# ডেটা ফোল্ডার এবং ফাইল পরিবর্তন চেক করার বিরতি (সেকেন্ড)
+DATA_DIR = os.getenv("DATA_DIR", "data")
+RELOAD_CHECK_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "5"))
+
+DATA_FILES = {
+    'routine': 'routine_data.json',
+    'courses': 'course_info.json',
+    'faculty': 'faculty_info.json',
+    'bus': 'bus_info.json',
+}
+
+# অ্যাডমিন পরিবর্তনের জার্নাল: প্রতিটি লাইন একটি JSON অপারেশন, কম্প্যাকশনের পর খালি হয়
+JOURNAL_FILE = 'journal.log'
+# কোন অপারেশন কোন ডেটা বদলায়
+OP_TARGETS = {'add_routine': 'routine', 'set_course': 'courses', 'set_faculty': 'faculty'}
+
+# একটি স্ন্যাপশট একবার তৈরি হলে আর বদলানো হয় না; পরিবর্তন মানেই নতুন স্ন্যাপশট (নতুন version)
+Snapshot = namedtuple('Snapshot', ['version', 'routine', 'courses', 'faculty', 'bus'])
+
+_lock = threading.Lock()
+_snapshot = None
+_mtimes = {}
+_last_check = 0.0
+
+def data_path(name):
+    return os.path.join(DATA_DIR, DATA_FILES[name])
+
+def _empty(name):
+    return {} if name in ('courses', 'faculty') else []
+
+def _current_mtimes():
+    mtimes = {}
+    for name in DATA_FILES:
+        try:
+            mtimes[name] = os.stat(data_path(name)).st_mtime_ns
+        except OSError:
+            mtimes[name] = None
+    return mtimes
+
+def _load_file(name, previous):
+    try:
+        with open(data_path(name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError as e:
+        print(f"Error: Data file not found - {e}")
+        return _empty(name)
+    except (OSError, ValueError) as e:
+        # অর্ধেক লেখা বা ভাঙা ফাইল হলে আগের ডেটাই রেখে দেওয়া হয়
+        print(f"Error: Could not load {data_path(name)} - {e}")
+        return previous if previous is not None else _empty(name)
+
+def journal_path(suffix=''):
+    return os.path.join(DATA_DIR, JOURNAL_FILE + suffix)
+
+def read_journal():
+    # কম্প্যাকশন চলাকালীন সরানো জার্নাল (.compacting) আগে, তারপর বর্তমান জার্নাল
+    ops = []
+    for path in (journal_path('.compacting'), journal_path()):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        # ক্র্যাশে অর্ধেক লেখা লাইন; এটি কখনো স্বীকার (ack) করা হয়নি
+                        print(f"Warning: Ignoring truncated journal line in {path}")
+        except FileNotFoundError:
+            continue
+    return ops
+
+def _routine_key(entry):
+    return tuple(sorted(entry.items()))
+
+def apply_ops(data, ops):
+    # নতুন dict ফেরত দেয়; পুরনো স্ন্যাপশটের লিস্ট/ডিক্ট বদলানো হয় না।
+    # অপারেশনগুলো idempotent, তাই একই জার্নাল দুইবার চালালেও ডেটা একই থাকে
+    data = dict(data)
+    copied = set()
+    routine_keys = None
+
+    def writable(name):
+        if name not in copied:
+            data[name] = list(data[name]) if isinstance(data[name], list) else dict(data[name])
+            copied.add(name)
+        return data[name]
+
+    for op in ops:
+        kind = op.get('op')
+        if kind == 'add_routine':
+            routine = writable('routine')
+            if routine_keys is None:
+                routine_keys = {_routine_key(entry) for entry in routine}
+            for entry in op.get('entries', []):
+                key = _routine_key(entry)
+                if key not in routine_keys:
+                    routine.append(entry)
+                    routine_keys.add(key)
+        elif kind == 'set_course':
+            writable('courses')[op['code']] = op['name']
+        elif kind == 'set_faculty':
+            writable('faculty')[op['initial']] = op['name']
+    return data
+
+def reload(force=False):
+    global _snapshot, _mtimes, _last_check
+    with _lock:
+        mtimes = _current_mtimes()
+        _last_check = time.monotonic()
+        if _snapshot is not None and not force and mtimes == _mtimes:
+            return _snapshot
+
+        data = {}
+        for name in DATA_FILES:
+            previous = getattr(_snapshot, name) if _snapshot is not None else None
+            if force or previous is None or mtimes[name] != _mtimes.get(name):
+                data[name] = _load_file(name, previous)
+            else:
+                data[name] = previous
+
+        # ফাইলে এখনো না লেখা অ্যাডমিন পরিবর্তনগুলো আবার প্রয়োগ
+        ops = read_journal()
+        if ops:
+            data = apply_ops(data, ops)
+
+        version = _snapshot.version + 1 if _snapshot is not None else 1
+        _mtimes = mtimes
+        # রেফারেন্স বদলানো অ্যাটমিক, তাই পাঠকেরা হয় পুরনো নয়তো নতুন স্ন্যাপশট পাবে
+        _snapshot = Snapshot(version=version, **data)
+        return _snapshot
+
+def commit_ops(ops):
+    # জার্নালে লেখা অপারেশন মেমোরিতে প্রয়োগ করে নতুন স্ন্যাপশট (ফাইল না পড়েই)
+    global _snapshot
+    current = get_snapshot()
+    with _lock:
+        current = _snapshot or current
+        data = {name: getattr(current, name) for name in DATA_FILES}
+        _snapshot = Snapshot(version=current.version + 1, **apply_ops(data, ops))
+        return _snapshot
+
+def mark_synced():
+    # কম্প্যাকশন নিজেই ফাইল লিখেছে, তাই সেই পরিবর্তনের জন্য আবার রিলোডের দরকার নেই
+    global _mtimes
+    with _lock:
+        _mtimes = _current_mtimes()
+
+def use_data_dir(path):
+    # অন্য ডেটা ফোল্ডারে যাওয়া (যেমন বেঞ্চমার্কের কৃত্রিম বড় ডেটাসেট)
+    global DATA_DIR
+    DATA_DIR = path
+    return reload(force=True)
+
+def get_snapshot():
+    snapshot = _snapshot
+    if snapshot is None or time.monotonic() - _last_check >= RELOAD_CHECK_INTERVAL:
+        snapshot = reload()
+    return snapshot
+
+def get_version():
+    return get_snapshot().version
+
+# ডেটা থেকে তৈরি ইনডেক্স/ভিউ প্রতি version এ একবারই তৈরি হয়
+_derived = {}
+
+def derived(name, builder, snapshot=None):
+    if snapshot is None:
+        snapshot = get_snapshot()
+    cached = _derived.get(name)
+    if cached is not None and cached[0] == snapshot.version:
+        return cached[1]
+    value = builder(snapshot)
+    _derived[name] = (snapshot.version, value)
+    return value
@@ -0,0 +1,66 @@
+import json
+import time
+import asyncio
+import itertools
+from collections import deque
+from telegram.request import BaseRequest
+
+# ==========================================================
+# টেলিগ্রামে না গিয়ে Bot API এর উত্তর দেয় এমন request
+# (TELEGRAM_OFFLINE=1 দিয়ে লোকালি webhook টেস্ট করার জন্য)
+# ==========================================================
+FAKE_BOT = {
+    'id': 1000000001,
+    'is_bot': True,
+    'first_name': 'MetroMate',
+    'username': 'metromate_offline_bot',
+}
+
+class FakeTelegramRequest(BaseRequest):
+    def __init__(self, latency=0.0, keep_last=1000):
+        # latency: প্রতিটি API কলের কৃত্রিম দেরি (সেকেন্ড)
+        self.latency = latency
+        self.sent = deque(maxlen=keep_last)
+        self.calls = 0
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, params):
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'from': FAKE_BOT,
+        }
+        if 'text' in params:
+            message['text'] = params['text']
+        return message
+
+    def _result(self, api_method, params):
+        if api_method == 'getMe':
+            return FAKE_BOT
+        if api_method == 'getUpdates':
+            return []
+        if api_method in ('sendMessage', 'editMessageText'):
+            return self._message(params)
+        return True
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls += 1
+        self.sent.append((api_method, params))
+        payload = {'ok': True, 'result': self._result(api_method, params)}
+        return 200, json.dumps(payload).encode('utf-8')
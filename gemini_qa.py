@@ -1,45 +1,284 @@
 import os
-import json
+import time
+import asyncio
+import threading
+import pytz
 import google.generativeai as genai
+import data_store
+import metrics
+from retrieval import build_context, mentions_batch
+from reply_cache import LRUCache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def ask_gemini(question, history=None):
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# প্রতিটি Gemini কলের সর্বোচ্চ সময় (সেকেন্ড)
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+# একসাথে সর্বোচ্চ কয়টি Gemini কল চলবে
+GEMINI_MAX_WORKERS = int(os.getenv("GEMINI_MAX_WORKERS", "8"))
+# 1 দিলে উত্তর অংশ অংশ করে এসে একই মেসেজ এডিট হয়
+GEMINI_STREAM = os.getenv("GEMINI_STREAM") == "1"
+# 1 দিলে আসল API এর বদলে স্টাব মডেল (অফলাইন টেস্ট)
+GEMINI_STUB = os.getenv("GEMINI_STUB") == "1"
+GEMINI_STUB_CHARS = int(os.getenv("GEMINI_STUB_CHARS", "600"))
+GEMINI_STUB_DELAY = float(os.getenv("GEMINI_STUB_DELAY", "0.05"))
+
+# Blocking generate_content কলগুলো এই পুলে চলে, ফলে event loop আটকে থাকে না
+_executor = ThreadPoolExecutor(max_workers=GEMINI_MAX_WORKERS, thread_name_prefix="gemini")
+_configured = False
+
+# ইতিহাস ছাড়া প্রশ্নের উত্তর ক্যাশ: (প্রশ্ন, ডেটা version, সময়ের বাকেট) অনুযায়ী
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+# "পরের বাস কখন" এর মতো উত্তর সময়ের সাথে বদলায়, তাই বাকেট ছোট রাখা হয়েছে (সেকেন্ড)
+ANSWER_CACHE_BUCKET = int(os.getenv("ANSWER_CACHE_BUCKET", "300"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(ANSWER_CACHE_BUCKET)))
+
+_answers = LRUCache(ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+# একই প্রশ্নের চলমান কল (single-flight)
+_inflight = {}
+_stats = {'shared': 0}
+
+# প্রতিটি Gemini কলের সময়, প্রম্পটের আকার, টোকেন ও ত্রুটি
+GEMINI_LATENCY = metrics.histogram("metromate_gemini_duration_seconds", "Upstream Gemini call latency", ("mode",))
+GEMINI_FIRST_CHUNK = metrics.histogram("metromate_gemini_first_chunk_seconds", "Time to the first streamed chunk")
+GEMINI_REQUESTS = metrics.counter("metromate_gemini_requests_total", "Gemini calls by outcome", ("mode", "status"))
+GEMINI_PROMPT_CHARS = metrics.histogram("metromate_gemini_prompt_chars", "Prompt size in characters", buckets=metrics.SIZE_BUCKETS)
+GEMINI_TOKENS = metrics.counter("metromate_gemini_tokens_total", "Tokens reported by usage_metadata", ("kind",))
+
+def _configure():
+    global _configured
+    if not _configured:
+        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+        _configured = True
+
+# ==========================================================
+# অফলাইন টেস্টের জন্য স্টাব মডেল (GEMINI_STUB=1)
+# ==========================================================
+class _StubChunk:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+class _StubUsage:
+    # আসল usage_metadata এর মতো আনুমানিক টোকেন (~৪ অক্ষরে এক টোকেন)
+    def __init__(self, prompt, answer):
+        self.prompt_token_count = len(prompt) // 4 + 1
+        self.candidates_token_count = len(answer) // 4 + 1
+
+class StubStreamingModel:
+    # আসল মডেলের মতো generate_content(prompt, stream=...) দেয়, কিন্তু নেটওয়ার্ক ছাড়া
+    def __init__(self, answer_chars=None, chunk_chars=40, chunk_delay=None):
+        # None হলে মডিউলের বর্তমান সেটিং (বেঞ্চমার্ক চলার সময় বদলানো যায়)
+        self.answer_chars = GEMINI_STUB_CHARS if answer_chars is None else answer_chars
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = GEMINI_STUB_DELAY if chunk_delay is None else chunk_delay
+
+    def _answer(self, prompt):
+        question = prompt.split("User question:", 1)[-1].split("\n", 1)[0].strip()
+        words = f"[stub] You asked: {question}.".split()
+        filler = "MetroMate stub answer line for offline testing.".split()
+        i = 0
+        while sum(len(w) + 1 for w in words) < self.answer_chars:
+            words.append(filler[i % len(filler)])
+            i += 1
+        return " ".join(words)
+
+    def _chunks(self, prompt, text):
+        for start in range(0, len(text), self.chunk_chars):
+            time.sleep(self.chunk_delay)
+            last = start + self.chunk_chars >= len(text)
+            yield _StubChunk(text[start:start + self.chunk_chars], _StubUsage(prompt, text) if last else None)
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        text = self._answer(prompt)
+        if stream:
+            return self._chunks(prompt, text)
+        time.sleep(self.chunk_delay * max(1, len(text) // self.chunk_chars))
+        return _StubChunk(text, _StubUsage(prompt, text))
+
+def _get_model():
+    if GEMINI_STUB:
+        return StubStreamingModel()
+    _configure()
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def _build_prompt(question, history=None, batch=None):
     # Get current date and time
-    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    # Load your data
-    with open('data/routine_data.json', encoding='utf-8') as f:
-        routine = json.load(f)
-    with open('data/faculty_info.json', encoding='utf-8') as f:
-        faculty = json.load(f)
-    with open('data/course_info.json', encoding='utf-8') as f:
-        courses = json.load(f)
-    with open('data/bus_info.json', encoding='utf-8') as f:
-        bus = json.load(f)
+    now_dt = datetime.now(pytz.timezone('Asia/Dhaka'))
+    now = now_dt.strftime('%Y-%m-%d %H:%M:%S')
+    # Only the rows relevant to this question go into the prompt
+    context = build_context(question, history=history, now=now_dt, batch=batch)
+    batch_line = f"The user's batch is {batch}; unless they name another batch, answer for this batch." if batch else ""
 
     # Prepare the prompt with current date/time and short-term history
     history_text = ""
     if history:
         for role, msg in history:
             history_text += f"[{role}] {msg}\n"
-    prompt = f"""
+    history_block = f"Recent conversation:\n{history_text}" if history_text else ""
+    return f"""
     [SYSTEM: Current date and time is {now}]
     Your name is MetroMate. You are a helpful Telegram bot for university routine, faculty, course, and bus info. If anyone asks about your name, always reply: 'Hi, I'm MetroMate.'
     If anyone asks about your developer, reply: 'I was developed by Abu Ubayda and Nahidul Islam Roni.'
-    Here is the data:
-    Routine: {routine}
-    Faculty: {faculty}
-    Courses: {courses}
-    Bus Schedule: {bus}
-    {(f'Recent conversation:\n{history_text}' if history_text else '')}
+    {batch_line}
+    Here is the data relevant to the question (pipe-separated tables):
+{context}
+    {history_block}
     User question: {question}
     Answer in Bangla if the question is in Bangla, otherwise in English.
     """
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    genai.configure(api_key=api_key)
+def _record_call(mode, started, usage, error):
+    GEMINI_LATENCY.observe(time.perf_counter() - started, mode)
+    GEMINI_REQUESTS.inc(mode, "error" if error else "ok")
+    if usage is not None:
+        GEMINI_TOKENS.inc("prompt", amount=getattr(usage, 'prompt_token_count', 0) or 0)
+        GEMINI_TOKENS.inc("completion", amount=getattr(usage, 'candidates_token_count', 0) or 0)
+
+def ask_gemini(question, history=None, timeout=GEMINI_TIMEOUT, batch=None):
+    prompt = _build_prompt(question, history, batch)
+    GEMINI_PROMPT_CHARS.observe(len(prompt))
+    started = time.perf_counter()
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(prompt)
-        return response.text
+        model = _get_model()
+        response = model.generate_content(prompt, request_options={"timeout": timeout})
+        text = response.text
     except Exception as e:
+        _record_call("single", started, None, True)
         return f"Gemini API error: {e}"
+    _record_call("single", started, getattr(response, 'usage_metadata', None), False)
+    return text
+
+def _stream_gemini(question, history, timeout, emit, cancelled, batch=None):
+    # থ্রেড পুলে চলে; প্রতিটি অংশ emit দিয়ে event loop এ পাঠানো হয়
+    prompt = _build_prompt(question, history, batch)
+    GEMINI_PROMPT_CHARS.observe(len(prompt))
+    started = time.perf_counter()
+    usage = None
+    error = False
+    first_chunk = True
+    try:
+        model = _get_model()
+        for chunk in model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+            if cancelled.is_set():
+                break
+            # টোকেন গণনা শেষ অংশে আসে
+            usage = getattr(chunk, 'usage_metadata', None) or usage
+            text = getattr(chunk, 'text', '')
+            if text:
+                if first_chunk:
+                    GEMINI_FIRST_CHUNK.observe(time.perf_counter() - started)
+                    first_chunk = False
+                emit(text)
+    except Exception as e:
+        error = True
+        emit(f"Gemini API error: {e}")
+    finally:
+        _record_call("stream", started, usage, error)
+        emit(None)
+
+async def _ask_gemini_in_pool(question, history, timeout, batch=None):
+    # ask_gemini কে থ্রেড পুলে পাঠানো হয়; handler task cancel হলে
+    # এখনো শুরু না হওয়া কলটিও বাতিল হয়ে যায়
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, ask_gemini, question, history, timeout, batch)
+    try:
+        # পুলে অপেক্ষার সময়সহ সামান্য অতিরিক্ত সময় দেওয়া হচ্ছে
+        return await asyncio.wait_for(future, timeout + 5)
+    except asyncio.TimeoutError:
+        return "Gemini API error: request timed out"
+
+def _answer_key(question, batch=None):
+    # "আজ কি ক্লাস আছে?" আর "আজ  কি ক্লাস আছে" একই প্রশ্ন
+    normalized = " ".join(question.lower().split()).rstrip("?!.।")
+    bucket = int(time.time() // ANSWER_CACHE_BUCKET)
+    # ব্যাচের নাম ছাড়া প্রশ্নের উত্তর ইউজারের ব্যাচ অনুযায়ী আলাদা
+    if batch and mentions_batch(question):
+        batch = None
+    return (normalized, batch, data_store.get_version(), bucket)
+
+def cached_answer(question, history=None, batch=None):
+    # ক্যাশে উত্তর থাকলে ফেরত দেয় (admission control এর আগে দেখার জন্য)
+    if history:
+        return None
+    key = _answer_key(question, batch)
+    if _answers.peek(key) is None:
+        return None
+    return _answers.get(key)
+
+async def ask_gemini_async(question, history=None, timeout=GEMINI_TIMEOUT, batch=None):
+    # আগের কথোপকথন থাকলে উত্তর প্রসঙ্গের উপর নির্ভর করে, তাই ক্যাশ নয়
+    if history:
+        return await _ask_gemini_in_pool(question, history, timeout, batch)
+
+    key = _answer_key(question, batch)
+    answer = _answers.get(key)
+    if answer is not None:
+        return answer
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_ask_gemini_in_pool(question, None, timeout, batch))
+        _inflight[key] = task
+
+        def _done(finished):
+            _inflight.pop(key, None)
+            if not finished.cancelled() and finished.exception() is None:
+                result = finished.result()
+                if not result.startswith("Gemini API error"):
+                    _answers.put(key, result)
+
+        task.add_done_callback(_done)
+    else:
+        _stats['shared'] += 1
+    # একই প্রশ্নের সবাই একটি কলের উত্তর ভাগ করে; একজন cancel করলেও বাকিদের কল চলতে থাকে
+    return await asyncio.shield(task)
+
+async def stream_gemini(question, history=None, timeout=GEMINI_TIMEOUT, batch=None):
+    # উত্তর অংশ অংশ করে দেয় (async generator); ইতিহাস ছাড়া প্রশ্নে ক্যাশ ব্যবহার হয়
+    key = None if history else _answer_key(question, batch)
+    if key is not None:
+        answer = _answers.get(key)
+        if answer is not None:
+            yield answer
+            return
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit(chunk):
+        loop.call_soon_threadsafe(queue.put_nowait, chunk)
+
+    loop.run_in_executor(_executor, _stream_gemini, question, history, timeout, emit, cancelled, batch)
+    deadline = loop.time() + timeout + 5
+    parts = []
+    failed = False
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                failed = True
+                yield "\nGemini API error: request timed out"
+                return
+            if chunk is None:
+                break
+            failed = failed or chunk.startswith("Gemini API error")
+            parts.append(chunk)
+            yield chunk
+    finally:
+        # গ্রাহক থেমে গেলে (cancel/timeout) থ্রেডটিও পরের অংশে থেমে যাবে
+        cancelled.set()
+
+    if key is not None and parts and not failed:
+        _answers.put(key, "".join(parts))
+
+def get_answer_cache_stats():
+    stats = _answers.stats()
+    stats['shared'] = _stats['shared']
+    stats['in_flight'] = len(_inflight)
+    return stats
+
+metrics.cache_collector("answer", get_answer_cache_stats)
+metrics.register_callback("metromate_answer_cache_shared_total", "counter", "Callers that joined an in-flight Gemini call", lambda: _stats['shared'])
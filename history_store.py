@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# কনফিগারেশন
+# ==========================================================
+# বট স্টেটের SQLite ফাইল (কথোপকথনের ইতিহাস ইত্যাদি)
+STATE_DB = os.getenv("STATE_DB", "bot_state.db")
+# প্রতি ইউজারের ইতিহাসে আনুমানিক সর্বোচ্চ কত টোকেন রাখা হবে
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+# টোকেন যাই হোক, প্রতি ইউজারের সর্বোচ্চ কয়টি মেসেজ
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "20"))
+# সব ইউজারের ইতিহাস মিলিয়ে মেমোরিতে সর্বোচ্চ কত অক্ষর
+HISTORY_MEMORY_CHARS = int(os.getenv("HISTORY_MEMORY_CHARS", "2000000"))
+# এতক্ষণ (সেকেন্ড) চুপ থাকা ইউজারের ইতিহাস মেমোরি থেকে সরানো হয় (ডিস্কে থেকে যায়)
+HISTORY_IDLE_SECONDS = float(os.getenv("HISTORY_IDLE_SECONDS", "3600"))
+# কতক্ষণ পর পর জমে থাকা পরিবর্তনগুলো একসাথে ডিস্কে লেখা হবে
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "5"))
+
+def estimate_tokens(text):
+    # আনুমানিক হিসাব: ইংরেজিতে ~৪ অক্ষরে এক টোকেন, বাংলায় আরও কম, তাই ৩ ধরা হয়েছে
+    return len(text) // 3 + 1
+
+# ==========================================================
+# মেমোরি-সীমিত, SQLite-এ write-behind করা ইতিহাস স্টোর
+# ==========================================================
+class HistoryStore:
+    def __init__(self, path=STATE_DB, token_budget=HISTORY_TOKEN_BUDGET, max_turns=HISTORY_MAX_TURNS,
+                 max_chars=HISTORY_MEMORY_CHARS, idle_seconds=HISTORY_IDLE_SECONDS):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self.idle_seconds = idle_seconds
+        # user_id -> {'turns': deque[(role, msg)], 'chars': int, 'seen': float}; পুরনো ব্যবহারকারী আগে
+        self._users = OrderedDict()
+        self._chars = 0
+        self._dirty = set()
+        # মেমোরি থেকে সরানো হয়েছে কিন্তু এখনো ডিস্কে লেখা হয়নি
+        self._pending = {}
+        # এই মুহূর্তে ডিস্কে লেখা হচ্ছে
+        self._writing = {}
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._task = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS history (user_id INTEGER PRIMARY KEY, turns TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _load(self, user_id):
+        if user_id in self._pending:
+            return list(self._pending[user_id])
+        if user_id in self._writing:
+            return list(self._writing[user_id])
+        row = self._db.execute("SELECT turns FROM history WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return []
+        try:
+            return [tuple(turn) for turn in json.loads(row[0])]
+        except ValueError:
+            return []
+
+    def _entry(self, user_id):
+        entry = self._users.get(user_id)
+        if entry is None:
+            turns = deque(self._load(user_id))
+            entry = {'turns': turns, 'chars': sum(len(msg) for _, msg in turns), 'seen': time.monotonic()}
+            self._users[user_id] = entry
+            self._chars += entry['chars']
+        else:
+            self._users.move_to_end(user_id)
+            entry['seen'] = time.monotonic()
+        return entry
+
+    def _trim(self, entry):
+        turns = entry['turns']
+        tokens = sum(estimate_tokens(msg) for _, msg in turns)
+        # সবচেয়ে নতুন মেসেজটি সবসময় থাকে
+        while len(turns) > 1 and (tokens > self.token_budget or len(turns) > self.max_turns):
+            _, msg = turns.popleft()
+            tokens -= estimate_tokens(msg)
+            entry['chars'] -= len(msg)
+            self._chars -= len(msg)
+
+    def _drop(self, user_id):
+        entry = self._users.pop(user_id)
+        self._chars -= entry['chars']
+        if user_id in self._dirty:
+            self._dirty.discard(user_id)
+            self._pending[user_id] = list(entry['turns'])
+
+    def _enforce_memory_cap(self, keep):
+        while self._chars > self.max_chars and len(self._users) > 1:
+            user_id = next(iter(self._users))
+            if user_id == keep:
+                break
+            self._drop(user_id)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entry(user_id)
+            self._enforce_memory_cap(keep=user_id)
+            return list(entry['turns'])
+
+    def append(self, user_id, role, message):
+        with self._lock:
+            entry = self._entry(user_id)
+            entry['turns'].append((role, message))
+            entry['chars'] += len(message)
+            self._chars += len(message)
+            self._trim(entry)
+            self._dirty.add(user_id)
+            self._enforce_memory_cap(keep=user_id)
+
+    def evict_idle(self):
+        with self._lock:
+            cutoff = time.monotonic() - self.idle_seconds
+            # OrderedDict এ পুরনো ব্যবহারকারীরা সামনে, তাই প্রথম সক্রিয় জনকে পেলেই থামা যায়
+            while self._users:
+                user_id, entry = next(iter(self._users.items()))
+                if entry['seen'] >= cutoff:
+                    break
+                self._drop(user_id)
+
+    def flush(self):
+        # লকের ভেতরে শুধু কপি নেওয়া হয়; SQLite এ লেখা লকের বাইরে, যাতে event loop আটকে না থাকে
+        with self._flush_lock:
+            with self._lock:
+                batch = dict(self._pending)
+                for user_id in self._dirty:
+                    batch[user_id] = list(self._users[user_id]['turns'])
+                if not batch:
+                    return 0
+                self._pending.clear()
+                self._dirty.clear()
+                # লেখা শেষ হওয়ার আগে কেউ আবার লোড করলে যেন পুরনো ডিস্কের কপি না পায়
+                self._writing = batch
+            now = time.time()
+            rows = [(user_id, json.dumps(turns, ensure_ascii=False), now) for user_id, turns in batch.items()]
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO history (user_id, turns, updated) VALUES (?, ?, ?)", rows)
+                self._db.commit()
+            except Exception:
+                with self._lock:
+                    # মেমোরিতে থাকলে সেটাই সবচেয়ে নতুন; নাহলে নতুন pending না থাকলেই ফেরত রাখা
+                    for user_id, turns in batch.items():
+                        if user_id in self._users:
+                            self._dirty.add(user_id)
+                        elif user_id not in self._pending:
+                            self._pending[user_id] = turns
+                raise
+            finally:
+                with self._lock:
+                    self._writing = {}
+            return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._users), 'chars': self._chars, 'dirty': len(self._dirty) + len(self._pending)}
+
+    # ==========================================================
+    # ব্যাকগ্রাউন্ড flush (Application এর post_init / post_shutdown থেকে)
+    # ==========================================================
+    async def _run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_idle()
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning("History flush failed: %s", e)
+
+    def start(self, interval=HISTORY_FLUSH_INTERVAL):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    def close(self):
+        self.flush()
+        self._db.close()
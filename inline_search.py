@@ -0,0 +1,120 @@
+import os
+import re
+from bisect import bisect_left
+import data_store
+import metrics
+from reply_cache import LRUCache
+from retrieval import NAME_STOPWORDS
+
+# ==========================================================
+# কনফিগারেশন
+# ==========================================================
+INLINE_MAX_RESULTS = int(os.getenv("INLINE_MAX_RESULTS", "20"))
+# কতগুলো কোয়েরির (প্রিফিক্স) ফলাফল মেমোরিতে রাখা হবে
+INLINE_CACHE_SIZE = int(os.getenv("INLINE_CACHE_SIZE", "2048"))
+# একটি প্রিফিক্সে সর্বোচ্চ কয়টি টার্ম দেখা হবে ("a" এর মতো ছোট কোয়েরির জন্য)
+INLINE_SCAN_LIMIT = 500
+
+KIND_FACULTY = "faculty"
+KIND_COURSE = "course"
+
+# টার্মের ধরন: ছোট সংখ্যা = আগে দেখানো হবে
+RANK_KEY = 0
+RANK_NAME = 1
+RANK_WORD = 2
+
+_WORD_SPLIT = re.compile(r"[^\w&]+")
+
+_results = LRUCache(INLINE_CACHE_SIZE)
+
+def _words(text):
+    return [word for word in _WORD_SPLIT.split(text.lower()) if word]
+
+# ==========================================================
+# প্রিফিক্স ইনডেক্স: সাজানো টার্মের তালিকা, bisect দিয়ে প্রিফিক্সের শুরু খোঁজা
+# টার্ম = ইনিশিয়াল/কোর্স কোড, পুরো নাম, এবং নামের প্রতিটি শব্দ (ছোট হাতের অক্ষরে)
+# ==========================================================
+def build_search_index(snapshot):
+    postings = []
+    entries = {}
+    for kind, table in ((KIND_FACULTY, snapshot.faculty), (KIND_COURSE, snapshot.courses)):
+        for key, name in table.items():
+            ref = (kind, key)
+            words = _words(name)
+            entries[ref] = (name, set(words) | set(_words(key)))
+            postings.append((key.lower(), RANK_KEY, kind, key))
+            postings.append((name.lower(), RANK_NAME, kind, key))
+            for word in set(words):
+                if word not in NAME_STOPWORDS:
+                    postings.append((word, RANK_WORD, kind, key))
+    postings.sort()
+    return {
+        'terms': [posting[0] for posting in postings],
+        'postings': postings,
+        'entries': entries,
+    }
+
+def get_search_index(snapshot=None):
+    return data_store.derived('search_index', build_search_index, snapshot)
+
+def _scan(index, prefix):
+    terms = index['terms']
+    postings = index['postings']
+    i = bisect_left(terms, prefix)
+    end = min(len(terms), i + INLINE_SCAN_LIMIT)
+    while i < end and terms[i].startswith(prefix):
+        yield postings[i]
+        i += 1
+
+def search(query, limit=INLINE_MAX_RESULTS, index=None):
+    # ফেরত দেয় [(kind, key, name), ...], সবচেয়ে ভালো মিল আগে
+    query = " ".join(query.lower().split())
+    if not query:
+        return []
+    if index is None:
+        snapshot = data_store.get_snapshot()
+        cache_key = (query, limit, snapshot.version)
+        cached = _results.get(cache_key)
+        if cached is not None:
+            return cached
+        index = get_search_index(snapshot)
+    else:
+        cache_key = None
+
+    best = {}
+
+    def consider(term, rank, kind, key):
+        # হুবহু মিল আগে, তারপর টার্মের ধরন, তারপর ছোট টার্ম
+        score = (term != query, rank, len(term), kind, key)
+        ref = (kind, key)
+        if ref not in best or score < best[ref]:
+            best[ref] = score
+
+    for posting in _scan(index, query):
+        consider(*posting)
+
+    words = query.split()
+    if len(words) > 1:
+        # "abdul mas" -> নামের শব্দগুলোর প্রিফিক্স হিসেবে সব শব্দই মিলতে হবে
+        entries = index['entries']
+        for term, rank, kind, key in _scan(index, words[0]):
+            name_words = entries[(kind, key)][1]
+            if all(any(word.startswith(part) for word in name_words) for part in words[1:]):
+                consider(term, RANK_WORD + 1, kind, key)
+
+    ranked = sorted(best, key=best.get)[:limit]
+    results = [(kind, key, index['entries'][(kind, key)][0]) for kind, key in ranked]
+    if cache_key is not None:
+        _results.put(cache_key, results)
+    return results
+
+def format_result(kind, key, name):
+    # কমান্ডের উত্তরের মতো একই লেখা (/faculty_info_cse, /course_info)
+    if kind == KIND_FACULTY:
+        return f"👨‍🏫 **শিক্ষক পরিচিতি:**\nনাম: {name}\nইনিশিয়াল: {key}\n"
+    return f"📚 **কোর্স পরিচিতি:**\nকোর্স নাম: {name}\nকোর্স কোড: {key}\n"
+
+def get_inline_cache_stats():
+    return _results.stats()
+
+metrics.cache_collector("inline", get_inline_cache_stats)
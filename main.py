@@ -1,15 +1,27 @@
 import os
+import asyncio
 import logging
 from dotenv import load_dotenv
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
-from telegram.request import HTTPXRequest
-from routine_data_manager import get_current_class, get_weekly_routine, get_faculty_info, get_course_info, get_bus_schedule
-from gemini_qa import ask_gemini
-from collections import defaultdict, deque
 
-# .env ফাইল থেকে টোকেন লোড করা
+# .env ফাইল থেকে টোকেন লোড করা (অন্য মডিউলগুলো ইমপোর্টের সময়ই কনফিগারেশন পড়ে, তাই আগে)
 load_dotenv()
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.ext import Application, CommandHandler, ContextTypes, InlineQueryHandler, MessageHandler, filters
+from telegram.request import HTTPXRequest
+from routine_data_manager import get_current_class, get_next_class, get_remaining_classes, get_weekly_routine, get_faculty_info, get_course_info, get_bus_schedule, resolve_batch
+from gemini_qa import GEMINI_STREAM, ask_gemini_async, cached_answer, stream_gemini
+from stream_reply import stream_to_message
+from history_store import HistoryStore
+from profile_store import ProfileStore
+from update_processor import TrackedUpdateProcessor
+from admission import AdmissionController
+from inline_search import KIND_FACULTY, format_result, search
+from subscriptions import KIND_BUS, KIND_CLASS, NOTIFY_LEAD_MINUTES, NOTIFY_MAX_LEAD_MINUTES, NotificationScheduler, SubscriptionStore, resolve_bus_stop
+import data_journal
+import metrics
+from metrics import timed
+
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
 # লগিং সেটআপ
@@ -18,14 +30,32 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-# আপনার ডিফল্ট ব্যাচ সেট করুন
-DEFAULT_BATCH = "CSE-58B" # আপনার ব্যাচ কোড এখানে পরিবর্তন করুন
+# /set_batch না করা ইউজারদের জন্য ডিফল্ট ব্যাচ
+DEFAULT_BATCH = os.getenv("DEFAULT_BATCH", "CSE-58B")
+
+# একসাথে কয়টি আপডেট প্রসেস হবে (একজনের Gemini উত্তরের জন্য বাকিরা আটকে থাকবে না)
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "32"))
+# এর মধ্যে কয়টি স্লট AI টেক্সট নিতে পারে না (কমান্ডের জন্য সংরক্ষিত)
+COMMAND_RESERVED_UPDATES = int(os.getenv("COMMAND_RESERVED_UPDATES", str(max(1, CONCURRENT_UPDATES // 4))))
+
+# "polling" (ডিফল্ট) অথবা "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# 1 দিলে টেলিগ্রামে কোনো রিকোয়েস্ট যায় না (লোকালি webhook টেস্ট করার জন্য)
+TELEGRAM_OFFLINE = os.getenv("TELEGRAM_OFFLINE") == "1"
+
+# প্রতি ইউজারের ব্যাচ (/set_batch), SQLite এ সংরক্ষিত
+profile_store = ProfileStore()
+
+def user_batch(update: Update) -> str:
+    user = update.effective_user
+    return (profile_store.get_batch(user.id) if user else None) or DEFAULT_BATCH
 
 # ==========================================================
 # কমান্ড হ্যান্ডলার ফাংশনসমূহ
 # ==========================================================
 
 # /start কমান্ড
+@timed("start")
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_name = update.effective_user.first_name
     await update.message.reply_text(
@@ -33,27 +63,67 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         f'ব্যবহারের জন্য নিচের কমান্ডগুলো ব্যবহার করুন:\n'
         f'/start - এই মেসেজটি দেখাবে\n'
         f'/class_current - বর্তমানে কোন ক্লাস চলছে তা জানাবে\n'
+        f'/class_next - আজকের পরের ক্লাস জানাবে\n'
+        f'/classes_left - আজকের বাকি ক্লাসগুলো দেখাবে\n'
         f'/weekly_routine - আপনার ব্যাচের সাপ্তাহিক রুটিন দেখাবে\n'
+        f'/set_batch <batch> - আপনার ব্যাচ সেট করুন (যেমন: /set_batch CSE-58B)\n'
         f'/faculty_info_cse <initial> - শিক্ষকের পূর্ণ নাম ও তথ্য জানাবে (যেমন: /faculty_info_cse NIR)\n'
         f'/faculty_info_cse <initial> - শিক্ষকের পূর্ণ নাম ও তথ্য জানাবে (যেমন: /faculty_info_cse NIR)\n'
         f'/course_info <code_name> - কোর্সের পূর্ণ নাম ও তথ্য জানাবে (যেমন: /course_info OOP)\n'
-        f'/bus - বাসের সময়সূচী জানাবে (যেমন: /bus বা /bus Tilagor)\n'
-        f'/about_us - বট সম্পর্কে বিস্তারিত জানুন'
+        f'/bus - বাসের সময়সূচী জানাবে (যেমন: /bus, /bus Tilaghor বা /bus Tilaghor before 9:00 AM)\n'
+        f'/about_us - বট সম্পর্কে বিস্তারিত জানুন\n\n'
+        f'যেকোনো চ্যাটে @{context.bot.username} লিখে শিক্ষকের ইনিশিয়াল, কোর্স কোড বা নামের অংশ লিখলেই খুঁজে পাবেন।'
     )
 
 # /class_current কমান্ড
+@timed("class_current")
 async def class_current_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    # এখানে ডিফল্ট ব্যাচ ব্যবহার করা হচ্ছে। আপনি চাইলে ইউজার থেকে ব্যাচ ইনপুট নিতে পারেন।
-    response = get_current_class(target_batch=DEFAULT_BATCH)
+    response = get_current_class(target_batch=user_batch(update))
+    await update.message.reply_text(response, parse_mode='Markdown')
+
+# /class_next কমান্ড
+@timed("class_next")
+async def class_next_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    response = get_next_class(target_batch=user_batch(update))
+    await update.message.reply_text(response, parse_mode='Markdown')
+
+# /classes_left কমান্ড
+@timed("classes_left")
+async def classes_left_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    response = get_remaining_classes(target_batch=user_batch(update))
     await update.message.reply_text(response, parse_mode='Markdown')
 
 # /weekly_routine কমান্ড
+@timed("weekly_routine")
 async def weekly_routine_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    # এখানে ডিফল্ট ব্যাচ ব্যবহার করা হচ্ছে।
-    response = get_weekly_routine(target_batch=DEFAULT_BATCH)
+    response = get_weekly_routine(target_batch=user_batch(update))
     await update.message.reply_text(response, parse_mode='Markdown')
 
+# /set_batch <batch> কমান্ড
+@timed("set_batch")
+async def set_batch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not context.args:
+        await update.message.reply_text(f"আপনার বর্তমান ব্যাচ: {user_batch(update)}\nবদলাতে: /set_batch CSE-58B")
+        return
+
+    batch, similar = resolve_batch(" ".join(context.args))
+    if batch is None:
+        if similar:
+            await update.message.reply_text("একটি ব্যাচ বেছে নিন: " + ", ".join(similar))
+        else:
+            await update.message.reply_text(f"দুঃখিত, '{' '.join(context.args)}' ব্যাচের কোনো রুটিন পাওয়া যায়নি।")
+        return
+
+    profile_store.set_batch(update.effective_user.id, batch)
+    # ক্লাস নোটিফিকেশন চালু থাকলে নতুন ব্যাচে সরিয়ে নেওয়া
+    chat_id = update.effective_chat.id
+    for kind, _, lead in subscription_store.of_chat(chat_id):
+        if kind == KIND_CLASS:
+            subscription_store.subscribe(chat_id, KIND_CLASS, batch, lead)
+    await update.message.reply_text(f"✅ আপনার ব্যাচ এখন {batch}।")
+
 # /faculty_info_cse <initial> কমান্ড
+@timed("faculty_info_cse")
 async def faculty_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # কমান্ডের পরের অংশ (initial) বের করা
     if not context.args:
@@ -65,6 +135,7 @@ async def faculty_info_command(update: Update, context: ContextTypes.DEFAULT_TYP
     await update.message.reply_text(response, parse_mode='Markdown')
 
 # /course_info <code_name> কমান্ড
+@timed("course_info")
 async def course_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # কমান্ডের পরের অংশ (course code) বের করা
     if not context.args:
@@ -76,12 +147,14 @@ async def course_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text(response, parse_mode='Markdown')
 
 # /bus কমান্ড
+@timed("bus")
 async def bus_schedule_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = " ".join(context.args) if context.args else None
     response = get_bus_schedule(query)
     await update.message.reply_text(response, parse_mode='Markdown')
 
 # /about_us কমান্ড
+@timed("about_us")
 async def about_us_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.message.reply_text(
         "*MetroMate - Your Campus Assistant*\n\n"
@@ -92,57 +165,248 @@ async def about_us_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         parse_mode='Markdown'
     )
 
+# ইনলাইন কোয়েরি: "@bot NI" বা "@bot algorithm" লিখলে শিক্ষক/কোর্সের তালিকা
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "300"))
+
+@timed("inline")
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    results = []
+    for kind, key, name in search(update.inline_query.query):
+        results.append(InlineQueryResultArticle(
+            id=f"{kind}:{key}"[:64],
+            title=f"{key} — {name}",
+            description="শিক্ষক" if kind == KIND_FACULTY else "কোর্স",
+            input_message_content=InputTextMessageContent(format_result(kind, key, name), parse_mode='Markdown'),
+        ))
+    await update.inline_query.answer(results, cache_time=INLINE_CACHE_TIME)
+
 # ==========================================================
-# মূল ফাংশন: বট চালু করা
+# নোটিফিকেশন সাবস্ক্রিপশন
 # ==========================================================
+subscription_store = SubscriptionStore()
+notification_scheduler = NotificationScheduler(subscription_store)
 
-def main() -> None:
-    if not BOT_TOKEN:
-        print("❌ ত্রুটি: BOT_TOKEN পাওয়া যায়নি। .env ফাইল চেক করুন।")
+def _lead_minutes(value):
+    # ঐচ্ছিক মিনিট আর্গুমেন্ট; ভুল হলে None
+    if value is None:
+        return NOTIFY_LEAD_MINUTES
+    if not value.isdigit() or not 0 < int(value) <= NOTIFY_MAX_LEAD_MINUTES:
+        return None
+    return int(value)
+
+# /subscribe_class [minutes] কমান্ড
+@timed("subscribe_class")
+async def subscribe_class_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    lead = _lead_minutes(context.args[0] if context.args else None)
+    if lead is None:
+        await update.message.reply_text(f"অনুগ্রহ করে ১ থেকে {NOTIFY_MAX_LEAD_MINUTES} এর মধ্যে মিনিট দিন। যেমন: /subscribe_class 15")
+        return
+    batch = user_batch(update)
+    subscription_store.subscribe(update.effective_chat.id, KIND_CLASS, batch, lead)
+    await update.message.reply_text(f"🔔 ঠিক আছে! {batch} এর প্রতিটি ক্লাসের {lead} মিনিট আগে জানানো হবে।")
+
+# /subscribe_bus <stop> [minutes] কমান্ড
+@timed("subscribe_bus")
+async def subscribe_bus_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    args = list(context.args or [])
+    lead = NOTIFY_LEAD_MINUTES
+    if len(args) > 1 and args[-1].isdigit():
+        lead = _lead_minutes(args.pop())
+    if not args or lead is None:
+        await update.message.reply_text(f"অনুগ্রহ করে স্টপেজ এবং ১ থেকে {NOTIFY_MAX_LEAD_MINUTES} এর মধ্যে মিনিট দিন। যেমন: /subscribe_bus Tilaghor 10")
+        return
+    stop, names = resolve_bus_stop(" ".join(args))
+    if stop is None:
+        if names:
+            await update.message.reply_text("একটি স্টপেজ বেছে নিন: " + ", ".join(names))
+        else:
+            await update.message.reply_text(f"❌ '{' '.join(args)}' নামে কোনো স্টপেজ পাওয়া যায়নি।")
         return
+    subscription_store.subscribe(update.effective_chat.id, KIND_BUS, stop, lead)
+    await update.message.reply_text(f"🚌 ঠিক আছে! {names[0]} দিয়ে যাওয়া প্রতিটি বাস ছাড়ার {lead} মিনিট আগে জানানো হবে।")
 
-    # Request অবজেক্ট তৈরি করা (টাইমআউট বাড়ানোর জন্য)
-    request = HTTPXRequest(connection_pool_size=8, read_timeout=30.0, write_timeout=30.0, connect_timeout=30.0)
+# /subscriptions কমান্ড
+@timed("subscriptions")
+async def subscriptions_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    rows = subscription_store.of_chat(update.effective_chat.id)
+    if not rows:
+        await update.message.reply_text("আপনার কোনো নোটিফিকেশন চালু নেই। /subscribe_class অথবা /subscribe_bus দিয়ে চালু করুন।")
+        return
+    lines = ["🔔 আপনার নোটিফিকেশন:"]
+    for kind, target, lead in rows:
+        label = "ক্লাস" if kind == KIND_CLASS else "বাস"
+        lines.append(f"• {label}: {target} ({lead} মিনিট আগে)")
+    await update.message.reply_text("\n".join(lines))
+
+# /unsubscribe [class|bus] কমান্ড
+@timed("unsubscribe")
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    kind = context.args[0].lower() if context.args else None
+    if kind not in (None, KIND_CLASS, KIND_BUS):
+        await update.message.reply_text("ব্যবহার: /unsubscribe, /unsubscribe class অথবা /unsubscribe bus")
+        return
+    removed = subscription_store.unsubscribe(update.effective_chat.id, kind)
+    await update.message.reply_text("🔕 নোটিফিকেশন বন্ধ করা হয়েছে।" if removed else "আপনার কোনো নোটিফিকেশন চালু ছিল না।")
 
-    # Application তৈরি করা
-    application = Application.builder().token(BOT_TOKEN).request(request).build()
+# Per-user and global limits for AI requests. Command priority comes from the update processor:
+# free-text (AI) updates never take the COMMAND_RESERVED_UPDATES slots, and waiting commands
+# get the next free slot before waiting AI updates.
+ai_admission = AdmissionController()
+if ai_admission.max_concurrent + ai_admission.max_queue >= CONCURRENT_UPDATES - COMMAND_RESERVED_UPDATES:
+    # Extra AI messages then wait for an update slot instead of getting a quick "busy" reply
+    logging.warning("AI_MAX_CONCURRENT + AI_MAX_QUEUE should be below CONCURRENT_UPDATES - COMMAND_RESERVED_UPDATES")
+
+# Short-term context per user: memory-capped, token-trimmed and persisted to SQLite in batches
+history_store = HistoryStore()
+
+metrics.register_callback("metromate_ai_admission_total", "counter", "AI requests by admission result",
+                          lambda: {(result,): count for result, count in ai_admission.stats.items()}, ("result",))
+metrics.register_callback("metromate_ai_active", "gauge", "AI requests holding a slot", lambda: ai_admission.snapshot()['active'])
+metrics.register_callback("metromate_ai_waiting", "gauge", "AI requests waiting for a slot", lambda: ai_admission.snapshot()['waiting'])
+metrics.register_callback("metromate_history_users", "gauge", "Users with history in memory", lambda: history_store.stats()['users'])
+metrics.register_callback("metromate_profiles", "gauge", "Users with a saved batch", profile_store.count)
+metrics.register_callback("metromate_subscriptions", "gauge", "Active notification subscriptions", subscription_store.count)
+metrics.register_callback("metromate_notification_events_pending", "gauge", "Notification events left for today", notification_scheduler.pending)
+metrics.register_callback("metromate_history_chars", "gauge", "History characters held in memory", lambda: history_store.stats()['chars'])
+
+# Any text message: Gemini AI answer
+@timed("ai")
+async def gemini_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_text = update.message.text
+    user_id = update.effective_user.id if update.effective_user else update.message.chat_id
+    # Earlier turns only; a first question with no history can be answered from the shared cache
+    history = history_store.get(user_id)
+    # Routine questions without a batch name are answered for the user's own batch
+    batch = user_batch(update)
+    # A cached answer costs nothing upstream, so it skips admission control
+    answer = cached_answer(user_text, history=history, batch=batch)
+    if answer is not None:
+        history_store.append(user_id, "User", user_text)
+        history_store.append(user_id, "Bot", answer)
+        await update.message.reply_text(answer)
+        return
+
+    async with ai_admission.admit(user_id) as admission:
+        if not admission.ok:
+            # Fast "busy" reply instead of queueing without bound
+            if admission.reason == "rate_limited":
+                await update.message.reply_text(f"⏳ আপনি খুব দ্রুত প্রশ্ন করছেন। {max(1, round(admission.retry_after))} সেকেন্ড পর আবার চেষ্টা করুন।")
+            else:
+                await update.message.reply_text("⚠️ এই মুহূর্তে অনেক প্রশ্ন আসছে। একটু পরে আবার চেষ্টা করুন।")
+            return
+
+        # Add user message to history
+        history_store.append(user_id, "User", user_text)
+        wait_msg = await update.message.reply_text("⏳ একটু অপেক্ষা করুন...")
+        if GEMINI_STREAM:
+            # Stream the answer into the wait message itself (throttled edits, split at the length limit)
+            answer = await stream_to_message(wait_msg, stream_gemini(user_text, history=history, batch=batch))
+            history_store.append(user_id, "Bot", answer)
+            return
+        # Ask Gemini (runs in the worker pool, not on the event loop)
+        answer = await ask_gemini_async(user_text, history=history, batch=batch)
+
+    # Add bot answer to history
+    history_store.append(user_id, "Bot", answer)
+    # Delete the wait message and send only the answer
+    try:
+        await wait_msg.delete()
+    except Exception:
+        pass
+    await update.message.reply_text(answer)
+
+# ==========================================================
+# মূল ফাংশন: বট চালু করা
+# ==========================================================
+
+# /metrics এর জন্য লোকাল HTTP সার্ভার (METRICS_LISTEN:METRICS_PORT), polling ও webhook দুই মোডেই
+metrics_server = None
+
+async def post_init(application: Application) -> None:
+    global metrics_server
+    # জমে থাকা ইতিহাস নির্দিষ্ট সময় পর পর একসাথে ডিস্কে লেখা
+    history_store.start()
+    # আগের রানের জার্নালে কিছু থেকে গেলে JSON ফাইলে লিখে ফেলা
+    await asyncio.to_thread(data_journal.compact)
+    metrics.start_dump()
+    # আজকের ক্লাস/বাসের নোটিফিকেশন
+    notification_scheduler.start(application.bot)
+    if metrics.METRICS_PORT:
+        from webhook_server import WebhookServer
+        metrics_server = WebhookServer(application, listen=metrics.METRICS_LISTEN, port=metrics.METRICS_PORT, path=None,
+                                       expose_metrics=True)
+        await metrics_server.start()
+
+async def post_shutdown(application: Application) -> None:
+    await notification_scheduler.stop()
+    if metrics_server is not None:
+        await metrics_server.stop()
+    await metrics.stop_dump()
+    await history_store.stop()
+    await asyncio.to_thread(data_journal.compact)
+
+def build_application(request=None, get_updates_request=None, token=None):
+    # Request অবজেক্ট তৈরি করা (টাইমআউট বাড়ানোর জন্য)
+    if request is None:
+        request = HTTPXRequest(connection_pool_size=max(8, CONCURRENT_UPDATES), read_timeout=30.0, write_timeout=30.0, connect_timeout=30.0)
+
+    # Application তৈরি করা (আপডেটগুলো একসাথে প্রসেস হবে)
+    builder = (
+        Application.builder()
+        .token(token or BOT_TOKEN)
+        .request(request)
+        .concurrent_updates(TrackedUpdateProcessor(CONCURRENT_UPDATES, reserved=COMMAND_RESERVED_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if get_updates_request is not None:
+        builder = builder.get_updates_request(get_updates_request)
+    application = builder.build()
+    # update_queue.qsize() প্রায় সবসময় 0 (fetcher সাথে সাথে তুলে নেয়); আসল অপেক্ষা processor এর সারিতে
+    processor = application.update_processor
+    metrics.register_callback("metromate_update_queue_depth", "gauge", "Updates waiting for a processing slot",
+                              lambda: application.update_queue.qsize() + processor.waiting)
+    metrics.register_callback("metromate_updates_in_flight", "gauge", "Updates being processed",
+                              lambda: processor.current_concurrent_updates)
 
     # কমান্ড হ্যান্ডলারগুলো যুক্ত করা
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("class_current", class_current_command))
+    application.add_handler(CommandHandler("class_next", class_next_command))
+    application.add_handler(CommandHandler("classes_left", classes_left_command))
     application.add_handler(CommandHandler("weekly_routine", weekly_routine_command))
+    application.add_handler(CommandHandler("set_batch", set_batch_command))
     application.add_handler(CommandHandler("faculty_info_cse", faculty_info_command))
     application.add_handler(CommandHandler("course_info", course_info_command))
     application.add_handler(CommandHandler("bus", bus_schedule_command))
     application.add_handler(CommandHandler("about_us", about_us_command))
+    application.add_handler(CommandHandler("subscribe_class", subscribe_class_command))
+    application.add_handler(CommandHandler("subscribe_bus", subscribe_bus_command))
+    application.add_handler(CommandHandler("subscriptions", subscriptions_command))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
 
-    # Store short-term context: user_id -> deque of (role, message)
-    user_histories = defaultdict(lambda: deque(maxlen=5))  # keep last 5 exchanges per user
+    application.add_handler(InlineQueryHandler(inline_query_handler))
+    application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), gemini_message_handler))
+    return application
 
-    # Any text message: Gemini AI answer
-    async def gemini_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        user_text = update.message.text
-        user_id = update.effective_user.id if update.effective_user else update.message.chat_id
-        # Add user message to history
-        user_histories[user_id].append(("User", user_text))
-        wait_msg = await update.message.reply_text("⏳ একটু অপেক্ষা করুন...")
-        # Pass recent history to Gemini
-        history = list(user_histories[user_id])
-        answer = ask_gemini(user_text, history=history)
-        # Add bot answer to history
-        user_histories[user_id].append(("Bot", answer))
-        # Delete the wait message and send only the answer
-        try:
-            await wait_msg.delete()
-        except Exception:
-            pass
-        await update.message.reply_text(answer)
+def main() -> None:
+    if TELEGRAM_OFFLINE:
+        from fake_telegram import FakeTelegramRequest
+        application = build_application(FakeTelegramRequest(), FakeTelegramRequest(), token=BOT_TOKEN or "0:offline")
+    elif not BOT_TOKEN:
+        print("❌ ত্রুটি: BOT_TOKEN পাওয়া যায়নি। .env ফাইল চেক করুন।")
+        return
+    else:
+        application = build_application()
 
-    application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), gemini_message_handler))
+    if BOT_MODE == "webhook":
+        from webhook_server import run_webhook
+        asyncio.run(run_webhook(application))
+        return
 
     # বট শুরু করা (এটি চলতে থাকবে যতক্ষণ না আপনি স্টপ করেন)
     print("🚀 বট চালু হয়েছে! Ctrl+C চাপলে বন্ধ হবে।")
     application.run_polling(poll_interval=3)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
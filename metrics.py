@@ -0,0 +1,290 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# কনফিগারেশন
+# ==========================================================
+# polling মোডে /metrics এর জন্য আলাদা লোকাল HTTP সার্ভার (0 = বন্ধ)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# দিলে নির্দিষ্ট সময় পর পর পুরো মেট্রিক্স এই ফাইলে লেখা হয় (node_exporter textfile ফরম্যাট)
+METRICS_DUMP_FILE = os.getenv("METRICS_DUMP_FILE")
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "60"))
+# এর চেয়ে ধীর (মিলিসেকেন্ড) হ্যান্ডলারের জন্য স্যাম্পলিং প্রোফাইল লগ করা হয় (0 = বন্ধ)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+_lock = threading.Lock()
+# নাম -> মেট্রিক; একই নামে আবার তৈরি করলে আগেরটি বদলে যায়
+_registry = {}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+# ==========================================================
+# মেট্রিক টাইপ: counter, histogram, এবং কলব্যাক (পড়ার সময় মান হিসাব)
+# ==========================================================
+class CounterMetric:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with _lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in items]
+
+class HistogramMetric:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label মান -> [প্রতি বাকেটের গণনা..., +Inf বাকেট, যোগফল]
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with _lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self):
+        with _lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    def __init__(self, name, kind, help_text, func, label_names=()):
+        # func একটি সংখ্যা অথবা {label মানের tuple: সংখ্যা} ফেরত দেয়
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.func = func
+
+    def samples(self):
+        value = self.func()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_labels(self.label_names, labels)} {_number(v)}" for labels, v in sorted(value.items())]
+
+def counter(name, help_text, label_names=()):
+    metric = _registry[name] = CounterMetric(name, help_text, label_names)
+    return metric
+
+def histogram(name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+    metric = _registry[name] = HistogramMetric(name, help_text, label_names, buckets)
+    return metric
+
+def register_callback(name, kind, help_text, func, label_names=()):
+    metric = _registry[name] = CallbackMetric(name, kind, help_text, func, label_names)
+    return metric
+
+def cache_collector(name, stats_func):
+    # LRUCache.stats() এর মতো dict থেকে hit/miss/size মেট্রিক
+    register_callback(f"metromate_{name}_cache_hits_total", "counter", f"{name} cache hits", lambda: stats_func()['hits'])
+    register_callback(f"metromate_{name}_cache_misses_total", "counter", f"{name} cache misses", lambda: stats_func()['misses'])
+    register_callback(f"metromate_{name}_cache_hit_ratio", "gauge", f"{name} cache hit ratio", lambda: stats_func()['hit_ratio'])
+    register_callback(f"metromate_{name}_cache_entries", "gauge", f"{name} cache entries", lambda: stats_func()['size'])
+
+# ==========================================================
+# Prometheus text exposition ফরম্যাট
+# ==========================================================
+def render():
+    lines = []
+    for name in sorted(_registry):
+        metric = _registry[name]
+        try:
+            samples = metric.samples()
+        except Exception as e:
+            logger.warning("Could not collect metric %s: %s", name, e)
+            continue
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+# ==========================================================
+# ধীর রিকোয়েস্টের জন্য স্যাম্পলিং প্রোফাইলার (PROFILE_SLOW_MS)
+# হ্যান্ডলার চলাকালীন event loop থ্রেডের স্ট্যাক নির্দিষ্ট বিরতিতে নেওয়া হয়;
+# কোনো হ্যান্ডলার ধীর হলে তার সময়ের স্যাম্পলগুলো থেকে সবচেয়ে বেশি দেখা স্ট্যাক লগ হয়।
+# loop আটকে রাখা CPU কাজ এখানে ধরা পড়ে; await এ অপেক্ষা নয়।
+# ==========================================================
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms=PROFILE_SLOW_MS, interval=PROFILE_INTERVAL, depth=4, keep=20000):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval
+        self.depth = depth
+        self._samples = deque(maxlen=keep)
+        self._active = 0
+        self._thread_id = None
+        self._wakeup = threading.Event()
+        self._sampler = None
+
+    def _stack(self, frame):
+        parts = []
+        while frame is not None and len(parts) < self.depth:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return " <- ".join(parts)
+
+    def _run(self):
+        while True:
+            if self._active <= 0:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._samples.append((time.perf_counter(), self._stack(frame)))
+            del frame
+            time.sleep(self.interval)
+
+    def begin(self):
+        self._thread_id = threading.get_ident()
+        self._active += 1
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+            self._sampler.start()
+        self._wakeup.set()
+
+    def end(self, label, started, elapsed):
+        self._active -= 1
+        if elapsed < self.threshold:
+            return None
+        stacks = Counter(stack for at, stack in list(self._samples) if at >= started)
+        total = sum(stacks.values())
+        lines = [f"{count * 100 // total:>3}% {stack}" for stack, count in stacks.most_common(5)] if total else ["(no samples)"]
+        report = f"Slow request {label}: {elapsed * 1000:.0f} ms, {total} samples\n" + "\n".join(lines)
+        logger.warning(report)
+        return report
+
+_profiler = SlowRequestProfiler() if PROFILE_SLOW_MS > 0 else None
+
+# ==========================================================
+# হ্যান্ডলারের সময় মাপা
+# ==========================================================
+COMMAND_LATENCY = histogram("metromate_command_duration_seconds", "Handler latency per command", ("command",))
+COMMAND_ERRORS = counter("metromate_command_errors_total", "Handlers that raised, per command", ("command",))
+_in_flight = Counter()
+
+def _in_flight_snapshot():
+    with _lock:
+        return {(command,): count for command, count in _in_flight.items()}
+
+register_callback("metromate_commands_in_flight", "gauge", "Handlers currently running, per command",
+                  _in_flight_snapshot, ("command",))
+
+def timed(command):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with _lock:
+                _in_flight[command] += 1
+            if _profiler is not None:
+                _profiler.begin()
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                COMMAND_ERRORS.inc(command)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                with _lock:
+                    _in_flight[command] -= 1
+                COMMAND_LATENCY.observe(elapsed, command)
+                if _profiler is not None:
+                    _profiler.end(command, started, elapsed)
+        return wrapper
+    return decorator
+
+# ==========================================================
+# পর্যায়ক্রমে ফাইলে লেখা (METRICS_DUMP_FILE)
+# ==========================================================
+def _write(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def dump(path):
+    _write(path, render())
+
+_dump_task = None
+
+async def _dump_periodically(path, interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # কলব্যাকগুলো loop এর অবস্থা পড়ে, তাই render loop এই; শুধু ফাইল লেখা থ্রেডে
+            await asyncio.to_thread(_write, path, render())
+        except OSError as e:
+            logger.warning("Metrics dump failed: %s", e)
+
+def start_dump(path=METRICS_DUMP_FILE, interval=METRICS_DUMP_INTERVAL):
+    global _dump_task
+    if path and _dump_task is None:
+        _dump_task = asyncio.create_task(_dump_periodically(path, interval))
+
+async def stop_dump(path=METRICS_DUMP_FILE):
+    global _dump_task
+    if _dump_task is not None:
+        _dump_task.cancel()
+        try:
+            await _dump_task
+        except asyncio.CancelledError:
+            pass
+        _dump_task = None
+        try:
+            await asyncio.to_thread(_write, path, render())
+        except OSError as e:
+            logger.warning("Metrics dump failed: %s", e)
@@ -0,0 +1,48 @@
+import os
+import time
+import sqlite3
+import threading
+from history_store import STATE_DB
+from reply_cache import LRUCache
+
+# কতজন ইউজারের প্রোফাইল মেমোরিতে রাখা হবে
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "50000"))
+
+# ==========================================================
+# ইউজার প্রোফাইল (এখন শুধু ব্যাচ): SQLite (STATE_DB) এ, মেমোরিতে ক্যাশসহ
+# ==========================================================
+class ProfileStore:
+    def __init__(self, path=STATE_DB, cache_size=PROFILE_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS profiles (user_id INTEGER PRIMARY KEY, batch TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+        # user_id -> batch (ব্যাচ সেট না করা ইউজারের জন্য "", যাতে বারবার ডিস্কে খুঁজতে না হয়)
+        self._batches = LRUCache(cache_size)
+
+    def get_batch(self, user_id):
+        with self._lock:
+            batch = self._batches.get(user_id)
+            if batch is None:
+                row = self._db.execute("SELECT batch FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+                batch = row[0] if row else ""
+                self._batches.put(user_id, batch)
+            return batch or None
+
+    def set_batch(self, user_id, batch):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, batch, updated) VALUES (?, ?, ?)",
+                (user_id, batch, time.time()),
+            )
+            self._db.commit()
+            self._batches.put(user_id, batch)
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+import data_store
+import metrics
+
+# কতগুলো তৈরি করা রিপ্লাই মেমোরিতে রাখা হবে
+REPLY_CACHE_SIZE = int(os.getenv("REPLY_CACHE_SIZE", "1024"))
+
+# ==========================================================
+# সীমিত আকারের LRU ক্যাশ (hit/miss গণনাসহ, ইচ্ছা করলে TTL)
+# ==========================================================
+class LRUCache:
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                expires, value = self._data[key]
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key):
+        # hit/miss না গুনে এবং LRU ক্রম না বদলে দেখা
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or (item[0] is not None and item[0] <= time.monotonic()):
+                return None
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+            }
+
+_replies = LRUCache(REPLY_CACHE_SIZE)
+_cached_version = None
+
+# ==========================================================
+# রিপ্লাই ফাংশনের ডেকোরেটর: key = (ফাংশন, নরমালাইজড আর্গুমেন্ট, ডেটা version)
+# ==========================================================
+def cached_reply(normalize):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            global _cached_version
+            # সব রিপ্লাই ফাংশনের একটিই আর্গুমেন্ট (positional বা keyword)
+            arg = args[0] if args else next(iter(kwargs.values()), None)
+            version = data_store.get_version()
+            if version != _cached_version:
+                # ডেটা বদলেছে (এডমিন এডিট বা ফাইল রিলোড), পুরনো সব রিপ্লাই বাদ
+                _replies.clear()
+                _cached_version = version
+            arg = normalize(arg)
+            key = (func.__name__, arg, version)
+            response = _replies.get(key)
+            if response is None:
+                # ফাংশনও নরমালাইজড আর্গুমেন্ট পায়, নাহলে "CSE-58B " এর উত্তর "CSE-58B" এর key তে জমা হয়
+                response = func(arg)
+                _replies.put(key, response)
+            return response
+        return wrapper
+    return decorator
+
+def get_cache_stats():
+    return _replies.stats()
+
+metrics.cache_collector("reply", get_cache_stats)
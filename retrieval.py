@@ -0,0 +1,262 @@
+import re
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+import data_store
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# প্রতিটি টেবিলে প্রম্পটে সর্বোচ্চ কয়টি সারি যাবে
+MAX_ROWS_PER_TABLE = 40
+
+DAY_NAMES = {
+    'saturday': 'শনিবার', 'sunday': 'রবিবার', 'monday': 'সোমবার', 'tuesday': 'মঙ্গলবার',
+    'wednesday': 'বুধবার', 'thursday': 'বৃহস্পতিবার', 'friday': 'শুক্রবার',
+}
+TODAY_WORDS = ('today', 'আজ')
+TOMORROW_WORDS = ('tomorrow', 'আগামীকাল')
+_ONE_DAY = timedelta(days=1)
+
+# নির্দিষ্ট কিছু না মিললে এই শব্দগুলো দেখে পুরো টেবিল (সীমিত সারি) যোগ করা হয়
+ROUTINE_KEYWORDS = ('class', 'routine', 'schedule', 'ক্লাস', 'রুটিন')
+FACULTY_KEYWORDS = ('teacher', 'faculty', 'sir', 'madam', 'শিক্ষক', 'স্যার', 'ম্যাডাম', 'ফ্যাকাল্টি')
+COURSE_KEYWORDS = ('course', 'subject', 'কোর্স', 'বিষয়')
+BUS_KEYWORDS = ('bus', 'stop', 'বাস', 'স্টপ')
+
+# শিক্ষকের নামের এই অংশগুলো দিয়ে খোঁজা হয় না
+NAME_STOPWORDS = {'md', 'md.', 'dr', 'dr.', 'professor', 'mr', 'mrs', 'ms', 'al', 'binte', 'eee', 'eng', 'bba', 'eco', 'swe', 'efe'}
+
+_TOKEN_SPLIT = re.compile(r"[\s,?!;:()\[\]{}\"'।|]+")
+
+_stats_lock = threading.Lock()
+_stats = {'prompts': 0, 'context_chars': 0, 'full_chars': 0, 'rows': 0}
+
+def _tokenize(text):
+    return [t.strip('.') for t in _TOKEN_SPLIT.split(text.lower()) if t.strip('.')]
+
+def _is_empty_bus(bus):
+    return not (bus.get('route_name') or bus.get('bus_no') or bus.get('route_details'))
+
+# ==========================================================
+# ইনডেক্স তৈরি (প্রতি ডেটা version এ একবার)
+# ==========================================================
+def build_index(snapshot):
+    terms = defaultdict(set)
+
+    def add(term, ref):
+        term = " ".join(_tokenize(term))
+        if term:
+            terms[term].add(ref)
+
+    rows_by_day = defaultdict(list)
+    rows_by_batch = defaultdict(list)
+    # কোর্স/শিক্ষকের পুরো নাম মিললে তাদের রুটিনের সারিও লাগে (কে পড়ায়, কোথায়, কখন)
+    rows_by_course = defaultdict(list)
+    rows_by_faculty = defaultdict(list)
+    # প্রশ্নে ব্যাচের নাম আছে কিনা দেখার জন্য
+    batch_terms = set()
+    for i, entry in enumerate(snapshot.routine):
+        ref = ('routine', i)
+        batch = entry.get('batch', '')
+        rows_by_batch[batch].append(i)
+        names = [batch]
+        # "58B" বা "58b" লিখলেও যেন CSE-58B মেলে
+        if '-' in batch:
+            names.append(batch.split('-', 1)[1])
+        for name in names:
+            add(name, ref)
+            batch_terms.add(" ".join(_tokenize(name)))
+        add(entry.get('course_code', ''), ref)
+        add(entry.get('faculty_initial', ''), ref)
+        rows_by_day[entry.get('day')].append(i)
+        rows_by_course[entry.get('course_code')].append(i)
+        rows_by_faculty[entry.get('faculty_initial')].append(i)
+
+    for initial, name in snapshot.faculty.items():
+        ref = ('faculty', initial)
+        add(initial, ref)
+        for word in _tokenize(name):
+            if len(word) >= 3 and word not in NAME_STOPWORDS:
+                add(word, ref)
+
+    for code, name in snapshot.courses.items():
+        ref = ('course', code)
+        add(code, ref)
+        add(name, ref)
+
+    bus_rows = []
+    for bus in snapshot.bus:
+        if _is_empty_bus(bus):
+            continue
+        ref = ('bus', len(bus_rows))
+        bus_rows.append(bus)
+        add(bus.get('route_name', ''), ref)
+        add(bus.get('bus_no', ''), ref)
+        for stop in bus.get('route_details', '').split('->'):
+            add(stop, ref)
+
+    full_chars = sum(len(str(part)) for part in (snapshot.routine, snapshot.faculty, snapshot.courses, snapshot.bus))
+    return {
+        'terms': dict(terms),
+        'max_ngram': max((term.count(' ') + 1 for term in terms), default=1),
+        'rows_by_day': dict(rows_by_day),
+        'rows_by_batch': dict(rows_by_batch),
+        'rows_by_course': dict(rows_by_course),
+        'rows_by_faculty': dict(rows_by_faculty),
+        'batch_terms': batch_terms - {''},
+        'batches': sorted(b for b in rows_by_batch if b),
+        'bus_rows': bus_rows,
+        'full_chars': full_chars,
+    }
+
+def get_index(snapshot=None):
+    return data_store.derived('retrieval_index', build_index, snapshot)
+
+# ==========================================================
+# প্রশ্ন অনুযায়ী প্রাসঙ্গিক সারি খুঁজে বের করা
+# ==========================================================
+def _ngrams(index, tokens):
+    for n in range(1, index['max_ngram'] + 1):
+        for i in range(len(tokens) - n + 1):
+            yield " ".join(tokens[i:i + n])
+
+def _match_refs(index, tokens):
+    refs = set()
+    terms = index['terms']
+    for term in _ngrams(index, tokens):
+        refs |= terms.get(term, set())
+    return refs
+
+def _names_batch(index, tokens):
+    return any(term in index['batch_terms'] for term in _ngrams(index, tokens))
+
+def mentions_batch(question):
+    # প্রশ্নে কোনো ব্যাচের নাম সরাসরি আছে কিনা
+    return _names_batch(get_index(), _tokenize(question))
+
+def _mentioned_days(text, now):
+    days = set()
+    for english, bangla in DAY_NAMES.items():
+        if english in text or bangla in text:
+            days.add(bangla)
+    if now is not None:
+        if any(word in text for word in TOMORROW_WORDS):
+            days.add(DAY_NAMES[(now + _ONE_DAY).strftime('%A').lower()])
+        elif any(word in text for word in TODAY_WORDS):
+            days.add(DAY_NAMES[now.strftime('%A').lower()])
+    return days
+
+def _has_keyword(tokens, keywords):
+    # বাংলা বিভক্তি (ক্লাসের, বাসে) ধরার জন্য শব্দের শুরু মেলানো হয়
+    return any(token.startswith(keyword) for token in tokens for keyword in keywords)
+
+def _select(snapshot, index, text, now, batch=None):
+    tokens = _tokenize(text)
+    refs = _match_refs(index, tokens)
+    days = _mentioned_days(text, now)
+
+    # প্রশ্নে অন্য ব্যাচের নাম না থাকলে ইউজারের নিজের ব্যাচের রুটিন
+    own_rows = None
+    if batch in index['rows_by_batch'] and not _names_batch(index, tokens):
+        own_rows = set(index['rows_by_batch'][batch])
+
+    routine_rows = {key for kind, key in refs if kind == 'routine'}
+    for kind, key in refs:
+        if kind == 'course':
+            routine_rows.update(index['rows_by_course'].get(key, ()))
+        elif kind == 'faculty':
+            routine_rows.update(index['rows_by_faculty'].get(key, ()))
+    if own_rows is not None:
+        # কোর্স/শিক্ষক মিললে নিজের ব্যাচের সারি; নিজের ব্যাচে না থাকলে সব ব্যাচের
+        routine_rows = (routine_rows & own_rows) or routine_rows
+    if days:
+        day_rows = {i for day in days for i in index['rows_by_day'].get(day, [])}
+        if own_rows is not None:
+            day_rows &= own_rows
+        routine_rows = routine_rows & day_rows if routine_rows else day_rows
+    elif not routine_rows and _has_keyword(tokens, ROUTINE_KEYWORDS):
+        routine_rows = own_rows if own_rows is not None else set(range(len(snapshot.routine)))
+    routine = [snapshot.routine[i] for i in sorted(routine_rows)]
+
+    faculty = {key for kind, key in refs if kind == 'faculty'}
+    faculty.update(entry.get('faculty_initial') for entry in routine)
+    if not faculty and _has_keyword(tokens, FACULTY_KEYWORDS):
+        faculty = set(snapshot.faculty)
+
+    courses = {key for kind, key in refs if kind == 'course'}
+    courses.update(entry.get('course_code') for entry in routine)
+    if not courses and _has_keyword(tokens, COURSE_KEYWORDS):
+        courses = set(snapshot.courses)
+
+    bus = {key for kind, key in refs if kind == 'bus'}
+    if not bus and _has_keyword(tokens, BUS_KEYWORDS):
+        bus = set(range(len(index['bus_rows'])))
+
+    return {
+        'routine': routine,
+        'faculty': [(k, snapshot.faculty[k]) for k in sorted(faculty) if k in snapshot.faculty],
+        'courses': [(k, snapshot.courses[k]) for k in sorted(courses) if k in snapshot.courses],
+        'bus': [index['bus_rows'][i] for i in sorted(bus)],
+    }
+
+# ==========================================================
+# প্রম্পটের জন্য সংক্ষিপ্ত টেবিল তৈরি
+# ==========================================================
+def _table(title, header, rows):
+    if not rows:
+        return []
+    lines = [f"{title} ({header}):"]
+    lines.extend(rows[:MAX_ROWS_PER_TABLE])
+    if len(rows) > MAX_ROWS_PER_TABLE:
+        lines.append(f"... {len(rows) - MAX_ROWS_PER_TABLE} more rows omitted")
+    return lines
+
+def _render(selected, index):
+    lines = []
+    lines += _table("Routine", "day|batch|time|course|room|faculty", [
+        f"{e.get('day')}|{e.get('batch')}|{e.get('start_time')}-{e.get('end_time')}|{e.get('course_code')}|{e.get('room')}|{e.get('faculty_initial')}"
+        for e in selected['routine']
+    ])
+    lines += _table("Faculty", "initial|name", [f"{k}|{v}" for k, v in selected['faculty']])
+    lines += _table("Courses", "code|name", [f"{k}|{v}" for k, v in selected['courses']])
+    lines += _table("Bus", "route|bus no|type|departure|arrival|from->to|stops", [
+        f"{b.get('route_name')}|{b.get('bus_no')}|{b.get('bus_type')}|{b.get('departure_time')}|{b.get('arrival_time')}"
+        f"|{b.get('departure_location')}->{b.get('arrival_location')}|{b.get('route_details')}"
+        for b in selected['bus']
+    ])
+    if not lines:
+        lines.append("No specific rows matched this question.")
+        lines.append(f"Known batches: {', '.join(index['batches'])}")
+    return "\n".join(lines)
+
+def build_context(question, history=None, now=None, batch=None):
+    snapshot = data_store.get_snapshot()
+    index = get_index(snapshot)
+    text = question.lower()
+    selected = _select(snapshot, index, text, now, batch)
+    # প্রশ্নে কিছু না মিললে (যেমন "আর সোমবার?") আগের প্রশ্ন দিয়ে আবার চেষ্টা
+    if not any(selected.values()) and history:
+        previous = [msg for role, msg in history if role == "User" and msg != question]
+        if previous:
+            selected = _select(snapshot, index, f"{previous[-1]} {question}".lower(), now, batch)
+
+    context = _render(selected, index)
+    rows = sum(len(rows) for rows in selected.values())
+    with _stats_lock:
+        _stats['prompts'] += 1
+        _stats['context_chars'] += len(context)
+        _stats['full_chars'] += index['full_chars']
+        _stats['rows'] += rows
+    logger.info("Prompt context: %d chars, %d rows (full data dump: %d chars)", len(context), rows, index['full_chars'])
+    return context
+
+def get_prompt_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['reduction'] = 1 - stats['context_chars'] / stats['full_chars'] if stats['full_chars'] else 0.0
+    return stats
+
+metrics.register_callback("metromate_prompt_context_chars_total", "counter", "Characters of data context sent in prompts", lambda: get_prompt_stats()['context_chars'])
+metrics.register_callback("metromate_prompt_reduction_ratio", "gauge", "Share of the full data dump left out of prompts", lambda: get_prompt_stats()['reduction'])
@@ -1,115 +1,221 @@
-import json
+import re
+import csv
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 import pytz
+import data_store
+import data_journal
+from reply_cache import cached_reply
 
-# JSON ফাইলগুলো data ফোল্ডার থেকে লোড করার ফাংশন
-def load_data():
+# সব ডেটা data_store থেকে আসে: একবার লোড হয়, ফাইল বদলালে নিজে থেকেই রিলোড হয়
+
+# সিলেট টাইমজোন (Asia/Dhaka)
+SYLHET_TZ = pytz.timezone('Asia/Dhaka')
+
+DAY_MAPPING = {
+    'Sunday': 'রবিবার', 'Monday': 'সোমবার', 'Tuesday': 'মঙ্গলবার', 
+    'Wednesday': 'বুধবার', 'Thursday': 'বৃহস্পতিবার', 'Friday': 'শুক্রবার', 
+    'Saturday': 'শনিবার'
+}
+
+# ==========================================================
+# রুটিন ইনডেক্স: (batch, day) -> শুরু অনুযায়ী সাজানো ক্লাস
+# ==========================================================
+def _to_minutes(time_str):
+    # "02:15 PM" -> 855 (মধ্যরাত থেকে মিনিট); ভুল ফরম্যাট হলে None
     try:
-        with open('data/routine_data.json', 'r', encoding='utf-8') as f:
-            routine = json.load(f)
-        with open('data/course_info.json', 'r', encoding='utf-8') as f:
-            courses = json.load(f)
-        with open('data/faculty_info.json', 'r', encoding='utf-8') as f:
-            faculty = json.load(f)
-        with open('data/bus_info.json', 'r', encoding='utf-8') as f:
-            bus = json.load(f)
-        return routine, courses, faculty, bus
-    except FileNotFoundError as e:
-        print(f"Error: Data file not found - {e}")
-        return [], {}, {}, []
-
-# গ্লোবাল ডেটা লোড করা
-routine_data, course_info, faculty_info, bus_info = load_data()
+        clock, meridiem = time_str.strip().split()
+        hour, minute = clock.split(':')
+        hour, minute = int(hour), int(minute)
+    except (AttributeError, ValueError):
+        return None
+    meridiem = meridiem.upper()
+    if not (1 <= hour <= 12 and 0 <= minute < 60) or meridiem not in ('AM', 'PM'):
+        return None
+    return (hour % 12 + (12 if meridiem == 'PM' else 0)) * 60 + minute
+
+def minute_to_label(minutes):
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour % 12) or 12:02d}:{minute:02d} {'PM' if hour >= 12 else 'AM'}"
+
+def build_routine_index(snapshot):
+    grouped = {}
+    for entry in snapshot.routine:
+        start = _to_minutes(entry.get('start_time'))
+        end = _to_minutes(entry.get('end_time'))
+        if start is None or end is None:
+            # সময় ফরম্যাট ভুল হলে এড়িয়ে যাওয়া
+            continue
+        grouped.setdefault((entry['batch'], entry['day']), []).append((start, end, entry))
+
+    index = {}
+    for key, slots in grouped.items():
+        slots.sort(key=lambda slot: slot[0])
+        starts = [slot[0] for slot in slots]
+        ends = [slot[1] for slot in slots]
+        # max_ends[i] = প্রথম i+1 টি ক্লাসের সবচেয়ে দেরিতে শেষ হওয়া সময় (ওভারল্যাপ ধরার জন্য)
+        max_ends = []
+        latest = -1
+        for end in ends:
+            latest = max(latest, end)
+            max_ends.append(latest)
+        index[key] = (starts, ends, max_ends, [slot[2] for slot in slots])
+    return index
+
+def get_routine_index(snapshot=None):
+    return data_store.derived('routine_index', build_routine_index, snapshot)
+
+# ==========================================================
+# ব্যাচভিত্তিক ভিউ: batch -> {day -> ক্লাস}, প্রতিটি ডেটা version এ একবার তৈরি
+# একটি ব্যাচের খোঁজ পুরো রুটিনের আকারের উপর নির্ভর করে না
+# ==========================================================
+def build_batch_views(snapshot):
+    views = {}
+    for (batch, day), slots in get_routine_index(snapshot).items():
+        views.setdefault(batch, {})[day] = slots
+    # ইউজার ছোট হাতের অক্ষরে লিখলেও ("cse-58b") আসল নাম পাওয়ার জন্য
+    names = {batch.strip().upper(): batch for batch in views}
+    return {'views': views, 'names': names, 'sorted': sorted(names)}
+
+def get_batch_views(snapshot=None):
+    return data_store.derived('batch_views', build_batch_views, snapshot)
+
+def get_batch_view(batch, snapshot=None):
+    return get_batch_views(snapshot)['views'].get(batch, {})
+
+def resolve_batch(text):
+    # ফেরত দেয় (রুটিনে থাকা ব্যাচের নাম অথবা None, কাছাকাছি ব্যাচগুলো)
+    batch_views = get_batch_views()
+    key = "".join(text.split()).upper()
+    if key in batch_views['names']:
+        return batch_views['names'][key], []
+    ordered = batch_views['sorted']
+    # একই প্রিফিক্সের ব্যাচগুলো ("CSE-58" -> CSE-58A, CSE-58B ...)
+    similar = []
+    for name in ordered[bisect_left(ordered, key):]:
+        if not name.startswith(key) or len(similar) >= 10:
+            break
+        similar.append(batch_views['names'][name])
+    return None, similar
+
+def _now():
+    now = datetime.now(SYLHET_TZ)
+    day_bengali = DAY_MAPPING.get(now.strftime('%A'), now.strftime('%A'))
+    return now, day_bengali, now.hour * 60 + now.minute
+
+def _find_current(slots, minute):
+    starts, ends, max_ends, entries = slots
+    # minute এর আগে বা ঠিক তখন শুরু হওয়া শেষ ক্লাসের পজিশন
+    i = bisect_right(starts, minute) - 1
+    while i >= 0 and max_ends[i] > minute:
+        if ends[i] > minute:
+            return i
+        i -= 1
+    return None
+
+def _format_class(entry, snapshot):
+    course_full_name = snapshot.courses.get(entry['course_code'], "নাম জানা নেই")
+    faculty_full_name = snapshot.faculty.get(entry['faculty_initial'], "নাম জানা নেই")
+    return (
+        f"কোর্স: {course_full_name} ({entry['course_code']})\n"
+        f"শিক্ষক: {faculty_full_name} ({entry['faculty_initial']})\n"
+        f"রুম: {entry['room']}\n"
+        f"সময়: {entry['start_time']} - {entry['end_time']}"
+    )
 
 # ==========================================================
 # ফাংশন ১: বর্তমান ক্লাস খুঁজে বের করা
 # ==========================================================
 def get_current_class(target_batch="CSE-60D"): # আপনার ব্যাচ এখানে ডিফল্ট হিসাবে ব্যবহার করতে পারেন
-    
-    # সিলেট টাইমজোন (Asia/Dhaka) সেট করা
-    sylhet_tz = pytz.timezone('Asia/Dhaka')
-    now = datetime.now(sylhet_tz)
-    
-    day_mapping = {
-        'Sunday': 'রবিবার', 'Monday': 'সোমবার', 'Tuesday': 'মঙ্গলবার', 
-        'Wednesday': 'বুধবার', 'Thursday': 'বৃহস্পতিবার', 'Friday': 'শুক্রবার', 
-        'Saturday': 'শনিবার'
-    }
-    current_day_english = now.strftime('%A')
-    current_day_bengali = day_mapping.get(current_day_english, current_day_english)
+    now, current_day_bengali, minute = _now()
     current_time_str = now.strftime('%I:%M %p') 
-    current_time = datetime.strptime(current_time_str, '%I:%M %p').time()
-    
-    current_class = None
     
-    for entry in routine_data:
-        if entry['day'] == current_day_bengali and entry['batch'] == target_batch:
-            
-            try:
-                start_time = datetime.strptime(entry['start_time'], '%I:%M %p').time()
-                end_time = datetime.strptime(entry['end_time'], '%I:%M %p').time()
-            except ValueError:
-                # সময় ফরম্যাট ভুল হলে এড়িয়ে যাওয়া
-                continue
-
-            if start_time <= current_time < end_time:
-                current_class = entry
-                break
+    snapshot = data_store.get_snapshot()
+    slots = get_batch_view(target_batch, snapshot).get(current_day_bengali)
+    position = _find_current(slots, minute) if slots else None
                 
-    if current_class:
-        course_full_name = course_info.get(current_class['course_code'], "নাম জানা নেই")
-        faculty_full_name = faculty_info.get(current_class['faculty_initial'], "নাম জানা নেই")
-        
+    if position is not None:
         return (
             f"✅ **বর্তমানে ক্লাস চলছে ({target_batch}):**\n"
-            f"কোর্স: {course_full_name} ({current_class['course_code']})\n"
-            f"শিক্ষক: {faculty_full_name} ({current_class['faculty_initial']})\n"
-            f"রুম: {current_class['room']}\n"
-            f"সময়: {current_class['start_time']} - {current_class['end_time']}"
+            + _format_class(slots[3][position], snapshot)
         )
     else:
         return f"আজ, **{current_day_bengali}** {current_time_str} এ আপনার ({target_batch}) কোনো ক্লাস চলছে না।"
 
+# ==========================================================
+# ফাংশন ১.১: পরের ক্লাস এবং আজকের বাকি ক্লাস
+# ==========================================================
+def get_next_class(target_batch):
+    _, current_day_bengali, minute = _now()
+    snapshot = data_store.get_snapshot()
+    slots = get_batch_view(target_batch, snapshot).get(current_day_bengali)
+    i = bisect_right(slots[0], minute) if slots else 0
+
+    if not slots or i >= len(slots[0]):
+        return f"আজ, **{current_day_bengali}** আপনার ({target_batch}) আর কোনো ক্লাস নেই।"
+    return (
+        f"⏭️ **পরের ক্লাস ({target_batch}):**\n"
+        + _format_class(slots[3][i], snapshot)
+    )
+
+def get_remaining_classes(target_batch):
+    _, current_day_bengali, minute = _now()
+    snapshot = data_store.get_snapshot()
+    slots = get_batch_view(target_batch, snapshot).get(current_day_bengali)
+    if not slots:
+        return f"আজ, **{current_day_bengali}** আপনার ({target_batch}) আর কোনো ক্লাস নেই।"
+
+    starts, ends, max_ends, entries = slots
+    upcoming = bisect_right(starts, minute)
+    # এখন চলমান ক্লাসগুলোও বাকি ক্লাসের মধ্যে ধরা হয়
+    first = upcoming
+    while first > 0 and max_ends[first - 1] > minute:
+        first -= 1
+    remaining = [entries[i] for i in range(first, len(entries)) if ends[i] > minute]
+    if not remaining:
+        return f"আজ, **{current_day_bengali}** আপনার ({target_batch}) আর কোনো ক্লাস নেই।"
+
+    lines = [f"📋 **আজকের বাকি ক্লাস ({target_batch}, {current_day_bengali}):**"]
+    for entry in remaining:
+        course_full_name = snapshot.courses.get(entry['course_code'], entry['course_code'])
+        lines.append(f"  🕰️ {entry['start_time']} - {entry['end_time']} | 📚 {course_full_name} | রুম: {entry['room']}")
+    return "\n".join(lines)
+
 # ==========================================================
 # ফাংশন ২: সাপ্তাহিক রুটিন তৈরি করা
 # ==========================================================
+@cached_reply(lambda batch: batch.strip())
 def get_weekly_routine(target_batch):
-    filtered_routine = [entry for entry in routine_data if entry['batch'] == target_batch]
-    
-    if not filtered_routine:
-        return f"দুঃখিত, ব্যাচ **{target_batch}** এর কোনো রুটিন পাওয়া যায়নি।"
-        
-    routine_by_day = {}
-    for entry in filtered_routine:
-        day = entry['day']
-        if day not in routine_by_day:
-            routine_by_day[day] = []
-        routine_by_day[day].append(entry)
-        
-    response = f"📅 **ব্যাচ {target_batch} এর সাপ্তাহিক রুটিন**\n"
+    snapshot = data_store.get_snapshot()
+    batch_view = get_batch_view(target_batch, snapshot)
     
     day_order = ['শনিবার', 'রবিবার', 'সোমবার', 'মঙ্গলবার', 'বুধবার', 'বৃহস্পতিবার', 'শুক্রবার']
     
+    parts = []
     for day in day_order:
-        if day in routine_by_day:
-            response += f"\n**--- {day} ---**\n"
-            sorted_classes = sorted(routine_by_day[day], key=lambda x: datetime.strptime(x['start_time'], '%I:%M %p'))
-            
-            for class_entry in sorted_classes:
-                course_full_name = course_info.get(class_entry['course_code'], class_entry['course_code'])
-                
-                response += (
-                    f"  🕰️ {class_entry['start_time']} - {class_entry['end_time']}\n"
-                    f"  📚 {course_full_name} | রুম: {class_entry['room']} | শিক্ষক: {class_entry['faculty_initial']}\n"
-                )
+        # ইনডেক্সে ক্লাসগুলো আগেই শুরুর সময় অনুযায়ী সাজানো আছে
+        slots = batch_view.get(day)
+        if not slots:
+            continue
+        parts.append(f"\n**--- {day} ---**\n")
+        for class_entry in slots[3]:
+            course_full_name = snapshot.courses.get(class_entry['course_code'], class_entry['course_code'])
+            parts.append(
+                f"  🕰️ {class_entry['start_time']} - {class_entry['end_time']}\n"
+                f"  📚 {course_full_name} | রুম: {class_entry['room']} | শিক্ষক: {class_entry['faculty_initial']}\n"
+            )
     
-    return response
+    if not parts:
+        return f"দুঃখিত, ব্যাচ **{target_batch}** এর কোনো রুটিন পাওয়া যায়নি।"
+    
+    return f"📅 **ব্যাচ {target_batch} এর সাপ্তাহিক রুটিন**\n" + "".join(parts)
 
 # ==========================================================
 # ফাংশন ৩: শিক্ষকের তথ্য খুঁজে বের করা
 # ==========================================================
+@cached_reply(lambda initial: initial.strip().upper())
 def get_faculty_info(initial):
-    full_name = faculty_info.get(initial.upper())
+    full_name = data_store.get_snapshot().faculty.get(initial.upper())
     if full_name:
         return f"👨‍🏫 **শিক্ষক পরিচিতি:**\nনাম: {full_name}\nইনিশিয়াল: {initial.upper()}\n"
     else:
@@ -118,85 +224,211 @@ def get_faculty_info(initial):
 # ==========================================================
 # ফাংশন ৪: কোর্সের তথ্য খুঁজে বের করা
 # ==========================================================
+@cached_reply(lambda code: code.strip().upper())
 def get_course_info(code):
-    full_name = course_info.get(code.upper())
+    full_name = data_store.get_snapshot().courses.get(code.upper())
     if full_name:
         return f"📚 **কোর্স পরিচিতি:**\nকোর্স নাম: {full_name}\nকোর্স কোড: {code.upper()}\n"
     else:
         return f"দুঃখিত, কোর্স কোড **{code.upper()}** এর জন্য কোনো তথ্য পাওয়া যায়নি।"
 
 # ==========================================================
-# ফাংশন ৫: বাসের সময়সূচী
+# বাস ইনডেক্স: স্টপেজ -> বাস, এবং ভুল বানানের জন্য trigram ইনডেক্স
 # ==========================================================
+# এর চেয়ে কম মিল হলে কাছাকাছি নাম হিসেবে ধরা হয় না
+FUZZY_MATCH_THRESHOLD = 0.4
+
+_BEFORE_PATTERN = re.compile(r'^(.*?)\s*(?:before|আগে)\s+(\d{1,2})(?::(\d{2}))?\s*([ap]m)$', re.IGNORECASE)
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_bus_index(snapshot):
+    records = []
+    names = {}  # নরমালাইজড নাম (স্টপেজ/রুট/বাস নং) -> বাসের পজিশন
+    display = {}
+    for bus in snapshot.bus:
+        # bus_info.json এর খালি placeholder রেকর্ড বাদ
+        if not (bus.get('route_name') or bus.get('bus_no') or bus.get('route_details')):
+            continue
+        position = len(records)
+        stops = [stop.strip() for stop in bus.get('route_details', '').split('->') if stop.strip()]
+        records.append({'bus': bus, 'stops': stops, 'departure': _to_minutes(bus.get('departure_time'))})
+        for name in stops + [bus.get('route_name', ''), bus.get('bus_no', '')]:
+            key = name.strip().lower()
+            if key:
+                names.setdefault(key, set()).add(position)
+                display.setdefault(key, name.strip())
+
+    trigrams = {}
+    for key in names:
+        for gram in _trigrams(key):
+            trigrams.setdefault(gram, set()).add(key)
+
+    def by_departure(positions):
+        timed = sorted((records[p]['departure'], p) for p in positions if records[p]['departure'] is not None)
+        return ([t for t, _ in timed], [p for _, p in timed])
+
+    # প্রতিটি নামের বাসগুলো ছাড়ার সময় অনুযায়ী সাজানো (সময়ের আগে কোন বাস, তা bisect দিয়ে)
+    departures = {key: by_departure(positions) for key, positions in names.items()}
+
+    return {
+        'records': records, 'names': names, 'display': display, 'trigrams': trigrams, 'departures': departures,
+        # ৩ অক্ষরের কম খোঁজার জন্য নামের শুরু দিয়ে bisect
+        'sorted_names': sorted(names),
+        # স্টপেজ ছাড়া "/bus before 9:00 AM" এর জন্য সব বাস
+        'all_departures': by_departure(range(len(records))),
+    }
+
+def get_bus_index(snapshot=None):
+    return data_store.derived('bus_index', build_bus_index, snapshot)
+
+def _partial_matches(query, bus_index):
+    # সব নাম না ঘেঁটে trigram ইনডেক্স থেকে শুধু সম্ভাব্য নামগুলো দেখা হয়
+    if len(query) < 3:
+        sorted_names = bus_index['sorted_names']
+        matches = []
+        for i in range(bisect_left(sorted_names, query), len(sorted_names)):
+            if not sorted_names[i].startswith(query):
+                break
+            matches.append(sorted_names[i])
+        return matches
+    grams = [query[i:i + 3] for i in range(len(query) - 2)]
+    candidate_sets = sorted((bus_index['trigrams'].get(gram, set()) for gram in grams), key=len)
+    candidates = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+    return sorted(key for key in candidates if query in key)
+
+def match_bus_names(query, bus_index):
+    # ফেরত দেয় (মিলে যাওয়া নামগুলো, ভুল বানান থেকে কাছাকাছি মিল কিনা)
+    query = query.strip().lower()
+    names = bus_index['names']
+    if query in names:
+        return [query], False
+    partial = _partial_matches(query, bus_index)
+    if partial:
+        return partial, False
+
+    query_grams = _trigrams(query)
+    candidates = set()
+    for gram in query_grams:
+        candidates |= bus_index['trigrams'].get(gram, set())
+    scored = []
+    for key in candidates:
+        key_grams = _trigrams(key)
+        score = len(query_grams & key_grams) / len(query_grams | key_grams)
+        if score >= FUZZY_MATCH_THRESHOLD:
+            scored.append((score, key))
+    if not scored:
+        return [], False
+    best = max(score for score, _ in scored)
+    return [key for score, key in scored if score == best], True
+
+def find_buses(query, before=None, bus_index=None):
+    # query স্টপেজ/রুট দিয়ে যাওয়া বাসগুলো; before (মিনিট) দিলে তার আগে ছাড়া বাসগুলোই
+    if bus_index is None:
+        bus_index = get_bus_index()
+    if not query.strip() and before is not None:
+        # স্টপেজ ছাড়া: ওই সময়ের আগে ছাড়া সব বাস
+        times, timed_positions = bus_index['all_departures']
+        records = bus_index['records']
+        return [records[p] for p in timed_positions[:bisect_right(times, before)]], [], False
+    matched, fuzzy = match_bus_names(query, bus_index)
+    positions = set()
+    for key in matched:
+        if before is None:
+            positions |= bus_index['names'][key]
+        else:
+            times, timed_positions = bus_index['departures'][key]
+            positions.update(timed_positions[:bisect_right(times, before)])
+    records = bus_index['records']
+    ordered = sorted(positions, key=lambda p: (records[p]['departure'] is None, records[p]['departure'] or 0, p))
+    return [records[p] for p in ordered], matched, fuzzy
+
+# ==========================================================
+# ফাংশন ৫: বাসের সময়সূচী
+# ==========================================================
+@cached_reply(lambda query: query.strip().lower() if query else None)
 def get_bus_schedule(query=None):
-    if not bus_info:
-        return "🚌 বর্তমানে কোনো বাসের তথ্য পাওয়া যায়নি।"
+    bus_index = get_bus_index()
+    if not bus_index['records']:
+        return "🚌 বর্তমানে কোনো বাসের তথ্য পাওয়া যায়নি।"
     
-    results = []
+    header = "🚌 **বিশ্ববিদ্যালয় বাস সময়সূচী:**\n"
+    matched = []
+    before = None
     if query:
-        query = query.strip().lower()
-        for bus in bus_info:
-            # Search in route details, route name, or bus no
-            route_details = bus.get('route_details', '').lower()
-            route_name = bus.get('route_name', '').lower()
-            bus_no = bus.get('bus_no', '').lower()
-            
-            if query in route_details or query in route_name or query in bus_no:
-                results.append(bus)
+        query = query.strip()
+        # "/bus Tilaghor before 9:00 AM" -> ৯টার আগে Tilaghor দিয়ে যাওয়া বাস
+        time_match = _BEFORE_PATTERN.match(query)
+        if time_match:
+            stop, hour, minute, meridiem = time_match.groups()
+            before = _to_minutes(f"{hour}:{minute or '00'} {meridiem}")
+            query = stop.strip()
+        results, matched, fuzzy = find_buses(query, before=before, bus_index=bus_index)
+        query = query.lower()
+        if fuzzy and results:
+            suggestions = ", ".join(bus_index['display'][key] for key in matched)
+            header = f"🔎 '{query}' হুবহু পাওয়া যায়নি, কাছাকাছি: **{suggestions}**\n" + header
+        if before is not None and results:
+            header += f"⏰ {minute_to_label(before)} এর আগে ছাড়ে এমন বাস\n"
     else:
-        results = bus_info
+        results = bus_index['records']
 
+    if not results and before is not None and not query:
+        return f"❌ {minute_to_label(before)} এর আগে ছাড়ে এমন কোনো বাস নেই।"
+    if not results and matched and before is not None:
+        return f"❌ {minute_to_label(before)} এর আগে '{query}' দিয়ে যাওয়া কোনো বাস নেই।"
     if not results:
-        return f"❌ '{query}' এর জন্য কোনো বাসের রুট পাওয়া যায়নি। দয়া করে বাসের শুরুর স্থান (Start Route) দিয়ে চেষ্টা করুন।"
+        return f"❌ '{query}' এর জন্য কোনো বাসের রুট পাওয়া যায়নি। দয়া করে বাসের শুরুর স্থান (Start Route) দিয়ে চেষ্টা করুন।"
 
-    response = "🚌 **বিশ্ববিদ্যালয় বাস সময়সূচী:**\n"
-    for bus in results:
-        route_details = bus.get('route_details', 'N/A')
-        
-        # Highlight the query in route details if it exists
-        if query and query in route_details.lower():
-            # Case-insensitive replacement to preserve original case but add markdown
-            import re
-            pattern = re.compile(re.escape(query), re.IGNORECASE)
-            route_details = pattern.sub(lambda m: f"**__{m.group(0)}__**", route_details)
-
-        response += (
+    highlighted = set(matched)
+    parts = [header]
+    for record in results:
+        bus = record['bus']
+        # মিলে যাওয়া স্টপেজগুলো হাইলাইট করা
+        route_details = " -> ".join(
+            f"**__{stop}__**" if stop.lower() in highlighted else stop for stop in record['stops']
+        ) or 'N/A'
+
+        parts.append(
             f"\n📍 **রুট:** {bus.get('route_name', 'N/A')} ({bus.get('departure_location', 'N/A')} ➡️ {bus.get('arrival_location', 'N/A')})\n"
             f"🚌 **বাস নং:** {bus.get('bus_no', 'N/A')} | 🏷️ **ধরন:** {bus.get('bus_type', 'N/A')}\n"
-            f"🕒 **সময়:** {bus.get('departure_time', 'N/A')} (ছাড়বে) - {bus.get('arrival_time', 'N/A')} (পৌঁছাবে)\n"
+            f"🕒 **সময়:** {bus.get('departure_time', 'N/A')} (ছাড়বে) - {bus.get('arrival_time', 'N/A')} (পৌঁছাবে)\n"
             f"🛣️ **স্টপেজ:** {route_details}\n"
         )
-    return response
+    return "".join(parts)
 
 # ==========================================================
 # ফাংশন ৬: ডেটা সেভ করা এবং নতুন এন্ট্রি যোগ করা (Admin Only)
 # ==========================================================
 
-def save_routine_data(data):
+def _save(name, data, label):
+    # পুরো ফাইল একবারে (অ্যাটমিকভাবে) লেখা; সাধারণ এডিটের জন্য নিচের add_* জার্নাল ব্যবহার করে
     try:
-        with open('data/routine_data.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        data_journal.write_atomic(data_store.data_path(name), data)
+        data_store.reload(force=True)
         return True
     except Exception as e:
-        print(f"Error saving routine data: {e}")
+        print(f"Error saving {label}: {e}")
         return False
 
+def save_routine_data(data):
+    return _save('routine', data, "routine data")
+
 def save_course_info(data):
-    try:
-        with open('data/course_info.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        return True
-    except Exception as e:
-        print(f"Error saving course info: {e}")
-        return False
+    return _save('courses', data, "course info")
 
 def save_faculty_info(data):
+    return _save('faculty', data, "faculty info")
+
+def _record(ops, label):
+    # জার্নালে append হলেই কাজ শেষ; JSON ফাইলে লেখা হয় পরে ব্যাকগ্রাউন্ডে
     try:
-        with open('data/faculty_info.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        data_journal.record(ops)
         return True
     except Exception as e:
-        print(f"Error saving faculty info: {e}")
+        print(f"Error saving {label}: {e}")
         return False
 
 def add_routine_entry(day, batch, start_time, end_time, course_code, room, faculty_initial):
@@ -209,28 +441,63 @@ def add_routine_entry(day, batch, start_time, end_time, course_code, room, facul
         "room": room,
         "faculty_initial": faculty_initial
     }
-    routine_data.append(new_entry)
-    if save_routine_data(routine_data):
+    if _record([{"op": "add_routine", "entries": [new_entry]}], "routine data"):
         return "✅ রুটিন এন্ট্রি সফলভাবে যোগ করা হয়েছে!"
     else:
         return "❌ রুটিন সেভ করতে সমস্যা হয়েছে।"
 
 def add_course_entry(code, full_name):
-    if code.upper() in course_info:
+    if code.upper() in data_store.get_snapshot().courses:
         return f"⚠️ কোর্স কোড {code.upper()} ইতিমধ্যে বিদ্যমান।"
     
-    course_info[code.upper()] = full_name
-    if save_course_info(course_info):
+    if _record([{"op": "set_course", "code": code.upper(), "name": full_name}], "course info"):
         return f"✅ কোর্স '{full_name}' ({code.upper()}) সফলভাবে যোগ করা হয়েছে!"
     else:
         return "❌ কোর্স ইনফো সেভ করতে সমস্যা হয়েছে।"
 
 def add_faculty_entry(initial, full_name):
-    if initial.upper() in faculty_info:
-        return f"⚠️ ইনিশিয়াল {initial.upper()} ইতিমধ্যে বিদ্যমান।"
+    if initial.upper() in data_store.get_snapshot().faculty:
+        return f"⚠️ ইনিশিয়াল {initial.upper()} ইতিমধ্যে বিদ্যমান।"
         
-    faculty_info[initial.upper()] = full_name
-    if save_faculty_info(faculty_info):
+    if _record([{"op": "set_faculty", "initial": initial.upper(), "name": full_name}], "faculty info"):
         return f"✅ শিক্ষক '{full_name}' ({initial.upper()}) সফলভাবে যোগ করা হয়েছে!"
     else:
-        return "❌ ফ্যাকাল্টি ইনফো সেভ করতে সমস্যা হয়েছে।"
\ No newline at end of file
+        return "❌ ফ্যাকাল্টি ইনফো সেভ করতে সমস্যা হয়েছে।"
+
+# ==========================================================
+# ফাংশন ৭: পুরো সেমিস্টারের রুটিন CSV থেকে একবারে ইমপোর্ট (Admin Only)
+# ==========================================================
+ROUTINE_CSV_FIELDS = ["day", "batch", "start_time", "end_time", "course_code", "room", "faculty_initial"]
+
+def import_routine_csv(source):
+    # source: CSV ফাইলের পাথ অথবা খোলা ফাইল; কলাম ROUTINE_CSV_FIELDS অনুযায়ী
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8-sig', newline='') as f:
+            return import_routine_csv(f)
+
+    reader = csv.DictReader(source)
+    missing = [field for field in ROUTINE_CSV_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        return f"❌ CSV তে এই কলামগুলো নেই: {', '.join(missing)}"
+
+    entries = []
+    skipped = []
+    for line_no, row in enumerate(reader, start=2):
+        entry = {field: (row.get(field) or "").strip() for field in ROUTINE_CSV_FIELDS}
+        # ইংরেজি দিনের নাম দিলেও চলবে
+        entry["day"] = DAY_MAPPING.get(entry["day"].capitalize(), entry["day"])
+        if (entry["day"] not in DAY_MAPPING.values() or not entry["batch"]
+                or _to_minutes(entry["start_time"]) is None or _to_minutes(entry["end_time"]) is None):
+            skipped.append(line_no)
+            continue
+        entries.append(entry)
+
+    if not entries:
+        return "❌ CSV তে কোনো সঠিক রুটিন এন্ট্রি পাওয়া যায়নি।"
+    # পুরো ইমপোর্ট একটি জার্নাল অপারেশন: একবার fsync, একটি নতুন ডেটা version
+    if not _record([{"op": "add_routine", "entries": entries}], "routine data"):
+        return "❌ রুটিন সেভ করতে সমস্যা হয়েছে।"
+    response = f"✅ {len(entries)} টি রুটিন এন্ট্রি ইমপোর্ট করা হয়েছে!"
+    if skipped:
+        response += f"\n⚠️ বাদ দেওয়া লাইন: {', '.join(map(str, skipped))}"
+    return response
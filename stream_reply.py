@@ -0,0 +1,90 @@
+import os
+import time
+import asyncio
+import logging
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# একই মেসেজ দুইবার এডিটের মাঝে ন্যূনতম বিরতি (সেকেন্ড), টেলিগ্রামের এডিট লিমিটের জন্য
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+# লেখা চলাকালীন শেষে দেখানো কার্সর
+CURSOR = " ▌"
+MESSAGE_LIMIT = MessageLimit.MAX_TEXT_LENGTH - len(CURSOR)
+
+# ==========================================================
+# লম্বা উত্তর টেলিগ্রামের সীমা অনুযায়ী ভাগ করা
+# ==========================================================
+def split_message(text, limit=MESSAGE_LIMIT):
+    # প্রথম limit অক্ষরের মধ্যে অনুচ্ছেদ, লাইন বা শব্দের শেষে কাটা হয়;
+    # তাই লেখা বাড়তে থাকলেও আগের অংশগুলো আর বদলায় না
+    parts = []
+    while len(text) > limit:
+        window = text[:limit + 1]
+        cut = -1
+        for separator in ("\n\n", "\n", " "):
+            cut = window.rfind(separator, 0, limit + 1)
+            if cut > 0:
+                break
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    parts.append(text)
+    return parts
+
+async def _edit(message, text, wait_on_limit=False):
+    try:
+        await message.edit_text(text)
+        return 0.0
+    except RetryAfter as e:
+        retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else float(e.retry_after)
+        if not wait_on_limit:
+            return retry_after
+        await asyncio.sleep(retry_after)
+        await message.edit_text(text)
+        return 0.0
+    except BadRequest as e:
+        # "Message is not modified" ক্ষতিকর নয়
+        if 'not modified' not in str(e).lower():
+            logger.warning("Could not edit streamed message: %s", e)
+        return 0.0
+
+# ==========================================================
+# অংশ অংশ করে আসা উত্তর দিয়ে placeholder মেসেজ এডিট করা
+# ==========================================================
+async def stream_to_message(placeholder, chunks, edit_interval=STREAM_EDIT_INTERVAL, limit=MESSAGE_LIMIT):
+    bot = placeholder.get_bot()
+    messages = [placeholder]
+    shown = [placeholder.text or ""]
+    text = ""
+    next_edit = 0.0
+
+    async def sync_parts(parts, final):
+        nonlocal next_edit
+        # সম্পূর্ণ হয়ে যাওয়া অংশগুলো চূড়ান্ত করা, নতুন অংশের জন্য নতুন মেসেজ
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            content = part if (final or not last) else part + CURSOR
+            if i >= len(messages):
+                messages.append(await bot.send_message(chat_id=placeholder.chat_id, text=content))
+                shown.append(content)
+                next_edit = time.monotonic() + edit_interval
+            elif shown[i] != content and (final or not last or time.monotonic() >= next_edit):
+                delay = await _edit(messages[i], content, wait_on_limit=final or not last)
+                if delay:
+                    next_edit = time.monotonic() + delay
+                    continue
+                shown[i] = content
+                if last:
+                    next_edit = time.monotonic() + edit_interval
+
+    async for chunk in chunks:
+        text += chunk
+        await sync_parts(split_message(text, limit), final=False)
+
+    if not text.strip():
+        text = "দুঃখিত, কোনো উত্তর পাওয়া যায়নি।"
+    await sync_parts(split_message(text, limit), final=True)
+    return text
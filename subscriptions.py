@@ -0,0 +1,265 @@
+import os
+import heapq
+import sqlite3
+import asyncio
+import logging
+import threading
+import itertools
+from collections import defaultdict
+from telegram.error import Forbidden, RetryAfter, TelegramError
+import data_store
+import metrics
+from admission import TokenBucket
+from history_store import STATE_DB
+from routine_data_manager import _format_class, _now, get_bus_index, get_routine_index, match_bus_names, minute_to_label
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# কনফিগারেশন
+# ==========================================================
+# ক্লাস/বাসের কত মিনিট আগে নোটিফিকেশন (ইউজার নিজে না দিলে)
+NOTIFY_LEAD_MINUTES = int(os.getenv("NOTIFY_LEAD_MINUTES", "10"))
+NOTIFY_MAX_LEAD_MINUTES = 120
+# টেলিগ্রামের সীমা: সব চ্যাট মিলিয়ে সেকেন্ডে ~৩০টি মেসেজ; নিরাপদ থাকার জন্য কম রাখা হয়েছে
+NOTIFY_PER_SECOND = float(os.getenv("NOTIFY_PER_SECOND", "25"))
+# একসাথে কয়টি মেসেজ পাঠানো হবে
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "25"))
+# সাবস্ক্রিপশন বা ডেটা বদলালে সর্বোচ্চ এতক্ষণ (সেকেন্ড) পর ইভেন্ট সারি নতুন করে তৈরি হয়
+NOTIFY_RECHECK_SECONDS = float(os.getenv("NOTIFY_RECHECK_SECONDS", "30"))
+
+KIND_CLASS = "class"
+KIND_BUS = "bus"
+
+NOTIFICATIONS = metrics.counter("metromate_notifications_total", "Notification messages by outcome", ("status",))
+
+# ==========================================================
+# সাবস্ক্রিপশন স্টোর: SQLite (STATE_DB) + মেমোরিতে (kind, target, lead) -> চ্যাট
+# ==========================================================
+class SubscriptionStore:
+    def __init__(self, path=STATE_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            "chat_id INTEGER NOT NULL, kind TEXT NOT NULL, target TEXT NOT NULL, lead INTEGER NOT NULL, "
+            "PRIMARY KEY (chat_id, kind, target))"
+        )
+        self._db.commit()
+        self._groups = defaultdict(set)
+        for chat_id, kind, target, lead in self._db.execute("SELECT chat_id, kind, target, lead FROM subscriptions"):
+            self._groups[(kind, target, lead)].add(chat_id)
+        # বদলালে বাড়ে; শিডিউলার এটা দেখে ইভেন্ট সারি নতুন করে তৈরি করে
+        self.version = 0
+
+    def _forget(self, chat_id, kind=None):
+        for key in [key for key, chats in self._groups.items() if chat_id in chats and kind in (None, key[0])]:
+            self._groups[key].discard(chat_id)
+            if not self._groups[key]:
+                del self._groups[key]
+
+    def subscribe(self, chat_id, kind, target, lead):
+        with self._lock:
+            # একই ধরনের আগের সাবস্ক্রিপশন (যেমন পুরনো ব্যাচ) বদলে যায়
+            self._db.execute("DELETE FROM subscriptions WHERE chat_id = ? AND kind = ?", (chat_id, kind))
+            self._db.execute("INSERT INTO subscriptions (chat_id, kind, target, lead) VALUES (?, ?, ?, ?)",
+                             (chat_id, kind, target, lead))
+            self._db.commit()
+            self._forget(chat_id, kind)
+            self._groups[(kind, target, lead)].add(chat_id)
+            self.version += 1
+
+    def unsubscribe(self, chat_id, kind=None):
+        with self._lock:
+            if kind is None:
+                cursor = self._db.execute("DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
+            else:
+                cursor = self._db.execute("DELETE FROM subscriptions WHERE chat_id = ? AND kind = ?", (chat_id, kind))
+            self._db.commit()
+            self._forget(chat_id, kind)
+            self.version += 1
+            return cursor.rowcount
+
+    def of_chat(self, chat_id):
+        with self._lock:
+            return sorted((kind, target, lead) for (kind, target, lead), chats in self._groups.items() if chat_id in chats)
+
+    def groups(self):
+        with self._lock:
+            return {key: list(chats) for key, chats in self._groups.items()}
+
+    def count(self):
+        with self._lock:
+            return sum(len(chats) for chats in self._groups.values())
+
+    def close(self):
+        self._db.close()
+
+def resolve_bus_stop(query):
+    # ফেরত দেয় (স্টপেজের নরমালাইজড নাম অথবা None, দেখানোর নামগুলো)
+    bus_index = get_bus_index()
+    matched, fuzzy = match_bus_names(query, bus_index)
+    names = [bus_index['display'][key] for key in matched[:5]]
+    if len(matched) == 1 and not fuzzy:
+        return matched[0], names
+    return None, names
+
+# ==========================================================
+# আজকের সব ইভেন্ট একটি সময়-অনুযায়ী সাজানো heap এ
+# (প্রতি ইউজারের জন্য আলাদা টাইমার নয়; প্রতি (target, lead, সময়) একটি ইভেন্ট)
+# ==========================================================
+def build_events(groups, day, snapshot, after_minute):
+    routine_index = get_routine_index(snapshot)
+    bus_index = get_bus_index(snapshot)
+    seq = itertools.count()
+    events = []
+    for kind, target, lead in groups:
+        if kind == KIND_CLASS:
+            slots = routine_index.get((target, day))
+            starts = sorted(set(slots[0])) if slots else []
+        else:
+            starts = sorted(set(bus_index['departures'].get(target, ([], []))[0]))
+        for start in starts:
+            fire = start - lead
+            if fire > after_minute:
+                events.append((fire, next(seq), kind, target, lead, start))
+    heapq.heapify(events)
+    return events
+
+def _class_text(target, lead, start, day, snapshot):
+    slots = get_routine_index(snapshot).get((target, day))
+    if not slots:
+        return None
+    classes = [entry for begin, entry in zip(slots[0], slots[3]) if begin == start]
+    body = "\n\n".join(_format_class(entry, snapshot) for entry in classes)
+    return f"🔔 {lead} মিনিট পর ক্লাস শুরু ({target}):\n{body}"
+
+def _bus_text(target, lead, start, snapshot):
+    bus_index = get_bus_index(snapshot)
+    times, positions = bus_index['departures'].get(target, ([], []))
+    lines = [f"🚌 {lead} মিনিট পর বাস ছাড়বে ({bus_index['display'].get(target, target)}):"]
+    for at, position in zip(times, positions):
+        if at == start:
+            bus = bus_index['records'][position]['bus']
+            lines.append(f"• {bus.get('route_name', 'N/A')} | বাস নং: {bus.get('bus_no', 'N/A')} | {bus.get('departure_time') or minute_to_label(start)}")
+    return "\n".join(lines) if len(lines) > 1 else None
+
+# ==========================================================
+# শিডিউলার: পরের ইভেন্ট পর্যন্ত ঘুম, তারপর রেট-লিমিট মেনে ব্যাচে পাঠানো
+# ==========================================================
+class NotificationScheduler:
+    def __init__(self, store, per_second=NOTIFY_PER_SECOND, batch_size=NOTIFY_BATCH_SIZE,
+                 recheck_seconds=NOTIFY_RECHECK_SECONDS):
+        self.store = store
+        self.batch_size = batch_size
+        self.recheck_seconds = recheck_seconds
+        self._bucket = TokenBucket(per_second, max(float(batch_size), per_second))
+        self._events = []
+        self._built = None
+        self._done_until = -1
+        self._task = None
+        self._bot = None
+
+    def _refresh(self, now, day, minute):
+        key = (now.date(), self.store.version, data_store.get_version())
+        if key == self._built:
+            return
+        if self._built is None or self._built[0] != key[0]:
+            # নতুন দিন (বা প্রথম চালু): এই মিনিটের ইভেন্টগুলোও ধরা হবে, আগেরগুলো নয়
+            self._done_until = minute - 1
+        # একই দিনে নতুন করে তৈরি হলে (সাবস্ক্রিপশন/ডেটা বদল) শেষ পাঠানো মিনিট নয়, এখনকার মিনিট থেকে;
+        # নাহলে নতুন সাবস্ক্রাইবার আগেই শুরু হয়ে যাওয়া ক্লাসের নোটিফিকেশন পায়
+        after_minute = max(self._done_until, minute - 1)
+        self._events = build_events(self.store.groups(), day, data_store.get_snapshot(), after_minute)
+        self._built = key
+
+    async def _tick(self):
+        now, day, minute = _now()
+        self._refresh(now, day, minute)
+        due = []
+        while self._events and self._events[0][0] <= minute:
+            due.append(heapq.heappop(self._events))
+        if due:
+            self._done_until = max(event[0] for event in due)
+            await self.fan_out(due, day)
+        if not self._events:
+            return self.recheck_seconds
+        seconds_now = now.second + now.microsecond / 1e6
+        return max(0.0, min(self.recheck_seconds, (self._events[0][0] - minute) * 60 - seconds_now))
+
+    async def fan_out(self, events, day):
+        snapshot = data_store.get_snapshot()
+        groups = self.store.groups()
+        # একই চ্যাটের একই মিনিটের সব নোটিফিকেশন একটি মেসেজে, তাই প্রতি চ্যাটে প্রতি ফ্যান-আউটে একটিই মেসেজ
+        messages = defaultdict(list)
+        for _, _, kind, target, lead, start in events:
+            if kind == KIND_CLASS:
+                text = _class_text(target, lead, start, day, snapshot)
+            else:
+                text = _bus_text(target, lead, start, snapshot)
+            if text is None:
+                continue
+            for chat_id in groups.get((kind, target, lead), ()):
+                messages[chat_id].append(text)
+        return await self.send_all({chat_id: "\n\n".join(texts) for chat_id, texts in messages.items()})
+
+    async def send_all(self, messages):
+        items = list(messages.items())
+        sent = 0
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            # সব চ্যাট মিলিয়ে সেকেন্ডে NOTIFY_PER_SECOND এর বেশি নয়
+            while not self._bucket.try_take(len(batch)):
+                await asyncio.sleep(self._bucket.retry_after(len(batch)))
+            results = await asyncio.gather(*(self._send(chat_id, text) for chat_id, text in batch))
+            sent += sum(results)
+        return sent
+
+    async def _send(self, chat_id, text, retry=True):
+        try:
+            await self._bot.send_message(chat_id=chat_id, text=text)
+            NOTIFICATIONS.inc("sent")
+            return True
+        except RetryAfter as e:
+            # flood control: বলা সময় অপেক্ষা করে একবার আবার চেষ্টা
+            NOTIFICATIONS.inc("retry_after")
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else float(e.retry_after)
+            if not retry:
+                return False
+            await asyncio.sleep(retry_after)
+            return await self._send(chat_id, text, retry=False)
+        except Forbidden:
+            # ইউজার বট ব্লক করেছে; আর পাঠানোর দরকার নেই
+            NOTIFICATIONS.inc("forbidden")
+            await asyncio.to_thread(self.store.unsubscribe, chat_id)
+            return False
+        except TelegramError as e:
+            NOTIFICATIONS.inc("error")
+            logger.warning("Could not notify %s: %s", chat_id, e)
+            return False
+
+    async def _run(self):
+        while True:
+            try:
+                delay = await self._tick()
+            except Exception as e:
+                logger.warning("Notification scheduler failed: %s", e)
+                delay = self.recheck_seconds
+            await asyncio.sleep(delay)
+
+    def start(self, bot):
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def pending(self):
+        return len(self._events)
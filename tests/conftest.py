@@ -0,0 +1,30 @@
+import os
+import sys
+import json
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# main.py মডিউল লোডের সময়ই স্টোর খোলে; টেস্টে রিপোর ফাইল নয়, অস্থায়ী ফাইল
+os.environ.setdefault('STATE_DB', os.path.join(tempfile.mkdtemp(prefix='metromate-test-'), 'bot_state.db'))
+os.environ.setdefault('GEMINI_STUB', '1')
+
+import data_store  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # Small dataset in a temp dir; data_store is switched back afterwards
+    def use(routine=(), courses=None, faculty=None, bus=()):
+        for name, data in (('routine_data.json', list(routine)), ('course_info.json', courses or {}),
+                           ('faculty_info.json', faculty or {}), ('bus_info.json', list(bus))):
+            with open(tmp_path / name, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        data_store.use_data_dir(str(tmp_path))
+        return tmp_path
+
+    original = data_store.DATA_DIR
+    yield use
+    data_store.use_data_dir(original)
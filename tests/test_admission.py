@@ -0,0 +1,51 @@
+import asyncio
+
+from admission import AdmissionController
+
+
+def _controller(**kwargs):
+    options = dict(max_concurrent=1, max_qps=1000, max_queue=1, queue_timeout=0.05,
+                   user_burst=100, user_per_minute=6000)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_timed_out_waiter_leaves_the_queue():
+    async def run():
+        controller = _controller()
+        holder = await controller.acquire(1)
+        assert holder.ok
+
+        timed_out = await controller.acquire(2)
+        assert (timed_out.ok, timed_out.reason) == (False, "busy")
+        assert controller.snapshot()['waiting'] == 0
+
+        # সারিতে কেউ নেই, তাই পরের জন অপেক্ষা করতে পারে এবং স্লট ছাড়লে পায়
+        waiter = asyncio.create_task(controller.acquire(3))
+        await asyncio.sleep(0.01)
+        assert controller.snapshot()['waiting'] == 1
+        controller.release()
+        assert (await waiter).ok
+        controller.release()
+        assert controller.snapshot()['active'] == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        controller = _controller(queue_timeout=5)
+        await controller.acquire(1)
+
+        waiter = asyncio.create_task(controller.acquire(2))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.snapshot()['waiting'] == 0
+
+        # স্লট ছাড়ার পর fast path আবার কাজ করে
+        controller.release()
+        assert (await controller.acquire(3)).ok
+        assert controller.snapshot()['active'] == 1
+
+    asyncio.run(run())
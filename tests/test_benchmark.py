@@ -0,0 +1,24 @@
+import asyncio
+
+import benchmark
+import data_store
+import main
+from fake_telegram import FakeTelegramRequest
+
+
+def test_small_synthetic_load_runs_without_errors(tmp_path, data_dir):
+    data_dir()
+    sizes = benchmark.generate_dataset(str(tmp_path / 'synthetic'), batches=30, routes=20, faculty=20, courses=20,
+                                       keep_batch=main.DEFAULT_BATCH)
+    data_store.use_data_dir(str(tmp_path / 'synthetic'))
+    assert sizes['batches'] == 30
+
+    async def run():
+        application = main.build_application(FakeTelegramRequest(), FakeTelegramRequest(), token="0:benchmark")
+        async with application:
+            return await benchmark.run_load(application, users=5, requests_per_user=4, mix=benchmark.DEFAULT_MIX)
+
+    latencies, errors, elapsed = asyncio.run(run())
+    assert sum(len(values) for values in latencies.values()) == 20
+    assert sum(errors.values()) == 0
+    assert elapsed > 0
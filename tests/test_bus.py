@@ -0,0 +1,25 @@
+from routine_data_manager import get_bus_index, get_bus_schedule, match_bus_names
+
+BUS = [
+    {"route_name": "Temukhi", "bus_no": "11-01", "bus_type": "Student", "departure_time": "08:10 AM",
+     "arrival_time": "08:50 AM", "departure_location": "Temukhi", "arrival_location": "Campus",
+     "route_details": "Temukhi -> Subid Bazar -> Tilaghor -> Campus", "comment": ""},
+    {"route_name": "Lakkatura", "bus_no": "11-02", "bus_type": "Student", "departure_time": "09:30 AM",
+     "arrival_time": "10:00 AM", "departure_location": "Lakkatura", "arrival_location": "Campus",
+     "route_details": "Lakkatura -> Bazar Point -> Campus", "comment": ""},
+]
+
+
+def test_partial_names_match_through_the_index(data_dir):
+    data_dir(bus=BUS)
+    bus_index = get_bus_index()
+    assert match_bus_names("bazar", bus_index) == (["bazar point", "subid bazar"], False)
+    assert match_bus_names("la", bus_index) == (["lakkatura"], False)
+    assert match_bus_names("tilagor", bus_index)[1] is True
+
+
+def test_before_without_a_stop_lists_every_earlier_bus(data_dir):
+    data_dir(bus=BUS)
+    reply = get_bus_schedule("before 9:00 AM")
+    assert "11-01" in reply and "11-02" not in reply
+    assert "এর আগে ছাড়ে এমন কোনো বাস নেই" in get_bus_schedule("before 7:00 AM")
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from history_store import HistoryStore
+
+
+class FailingWrites:
+    def __init__(self, db, during_write=None):
+        self.db = db
+        self.during_write = during_write
+
+    def execute(self, *args):
+        return self.db.execute(*args)
+
+    def executemany(self, *args):
+        if self.during_write:
+            self.during_write()
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_flush_writes_dirty_and_evicted_users(tmp_path):
+    path = str(tmp_path / 'state.db')
+    store = HistoryStore(path)
+    store.append(1, 'user', 'hello')
+    store.append(2, 'user', 'hi')
+    store._drop(2)
+    assert store.flush() == 2
+    assert store.flush() == 0
+    store.close()
+
+    reopened = HistoryStore(path)
+    assert reopened.get(1) == [('user', 'hello')]
+    assert reopened.get(2) == [('user', 'hi')]
+
+
+def test_failed_flush_keeps_entries_without_overwriting_newer_ones(tmp_path):
+    store = HistoryStore(str(tmp_path / 'state.db'))
+    store.append(1, 'user', 'in memory')
+    store.append(2, 'user', 'evicted')
+    store._drop(2)
+
+    db = store._db
+    # লেখা চলাকালীন ইউজার 2 আবার লেখে; ব্যর্থ flush যেন এই নতুন ইতিহাস মুছে না দেয়
+    store._db = FailingWrites(db, during_write=lambda: store.append(2, 'user', 'newer'))
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    store._db = db
+
+    assert store.stats()['dirty'] == 2
+    assert store.flush() == 2
+    store._drop(1)
+    store._drop(2)
+    assert store.get(1) == [('user', 'in memory')]
+    assert store.get(2) == [('user', 'evicted'), ('user', 'newer')]
@@ -0,0 +1,40 @@
+import socket
+import asyncio
+
+import main
+import metrics
+from fake_telegram import FakeTelegramRequest
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response.decode('utf-8')
+
+
+def test_metrics_port_serves_prometheus_metrics(data_dir, monkeypatch):
+    data_dir()
+    port = _free_port()
+    monkeypatch.setattr(metrics, 'METRICS_PORT', port)
+
+    async def run():
+        application = main.build_application(FakeTelegramRequest(), FakeTelegramRequest(), token="0:test")
+        await main.post_init(application)
+        try:
+            return await _get(port, '/metrics'), await _get(port, '/healthz')
+        finally:
+            await main.post_shutdown(application)
+
+    metrics_response, health_response = asyncio.run(run())
+    assert metrics_response.startswith("HTTP/1.1 200")
+    assert "metromate_update_queue_depth" in metrics_response
+    assert health_response.startswith("HTTP/1.1 200")
@@ -0,0 +1,42 @@
+import data_store
+import reply_cache
+from reply_cache import cached_reply
+
+calls = []
+
+
+@cached_reply(lambda name: name.strip().upper())
+def lookup(name):
+    calls.append(name)
+    return f"reply for {name}"
+
+
+def test_hit_miss_and_normalized_argument(data_dir):
+    data_dir()
+    calls.clear()
+    hits, misses = reply_cache.get_cache_stats()['hits'], reply_cache.get_cache_stats()['misses']
+
+    assert lookup(' nzr') == "reply for NZR"
+    assert lookup('NZR') == "reply for NZR"
+    assert lookup(name='nzr ') == "reply for NZR"
+    assert calls == ['NZR']
+    stats = reply_cache.get_cache_stats()
+    assert (stats['hits'] - hits, stats['misses'] - misses) == (2, 1)
+
+
+def test_version_bump_invalidates_replies(data_dir):
+    data_dir()
+    calls.clear()
+    lookup('abc')
+    data_store.reload(force=True)
+    lookup('abc')
+    assert calls == ['ABC', 'ABC']
+
+
+def test_padded_batch_does_not_poison_the_valid_lookup(data_dir):
+    from routine_data_manager import get_weekly_routine
+    data_dir(routine=[{"day": "রবিবার", "batch": "CSE-58B", "start_time": "08:00 AM", "end_time": "09:15 AM",
+                       "course_code": "C1", "room": "101", "faculty_initial": "ABC"}])
+    padded = get_weekly_routine('CSE-58B ')
+    assert "দুঃখিত" not in padded
+    assert get_weekly_routine('CSE-58B') == padded
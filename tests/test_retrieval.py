@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from retrieval import build_context, mentions_batch
+
+ROUTINE = [
+    {"day": "রবিবার", "batch": "CSE-58A", "start_time": "08:00 AM", "end_time": "09:15 AM",
+     "course_code": "C1", "room": "101", "faculty_initial": "ABC"},
+    {"day": "রবিবার", "batch": "CSE-58B", "start_time": "09:15 AM", "end_time": "10:30 AM",
+     "course_code": "C2", "room": "202", "faculty_initial": "XYZ"},
+    {"day": "সোমবার", "batch": "CSE-58B", "start_time": "08:00 AM", "end_time": "09:15 AM",
+     "course_code": "C1", "room": "203", "faculty_initial": "ABC"},
+]
+SUNDAY = datetime(2026, 10, 18, 9, 0)
+
+
+def _rows(context):
+    return [line for line in context.splitlines() if line.count('|') == 5 and not line.startswith('Routine')]
+
+
+def test_day_question_uses_the_users_batch(data_dir):
+    data_dir(routine=ROUTINE)
+    rows = _rows(build_context("আজ কি ক্লাস আছে?", now=SUNDAY, batch="CSE-58B"))
+    assert rows == ["রবিবার|CSE-58B|09:15 AM-10:30 AM|C2|202|XYZ"]
+
+
+def test_named_batch_overrides_the_users_batch(data_dir):
+    data_dir(routine=ROUTINE)
+    rows = _rows(build_context("58A আজ কি ক্লাস আছে?", now=SUNDAY, batch="CSE-58B"))
+    assert rows == ["রবিবার|CSE-58A|08:00 AM-09:15 AM|C1|101|ABC"]
+    assert mentions_batch("cse-58a routine")
+    assert not mentions_batch("আজ কি ক্লাস আছে?")
+
+
+def test_course_question_prefers_the_users_batch(data_dir):
+    data_dir(routine=ROUTINE)
+    assert [row.split('|')[1] for row in _rows(build_context("C1 class", batch="CSE-58B"))] == ["CSE-58B"]
+    # নিজের ব্যাচে কোর্সটি না থাকলে সব ব্যাচের সারি
+    assert [row.split('|')[1] for row in _rows(build_context("C2 class", batch="CSE-58A"))] == ["CSE-58B"]
+
+
+def test_full_course_name_pulls_in_its_routine_rows(data_dir):
+    data_dir(routine=ROUTINE, courses={"C1": "Artificial Intelligence", "C2": "Operating System"},
+             faculty={"ABC": "Alpha Beta Chowdhury", "XYZ": "Xenia Young Zaman"})
+    context = build_context("who teaches Artificial Intelligence?", batch="CSE-58B")
+    assert _rows(context) == ["সোমবার|CSE-58B|08:00 AM-09:15 AM|C1|203|ABC"]
+    assert "ABC|Alpha Beta Chowdhury" in context
+    assert "XYZ|" not in context
@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime
+
+import subscriptions
+from routine_data_manager import SYLHET_TZ
+from subscriptions import KIND_CLASS, NotificationScheduler, SubscriptionStore
+
+DAY = 'রবিবার'
+ROUTINE = [
+    {"day": DAY, "batch": "T-1", "start_time": "02:15 PM", "end_time": "03:30 PM",
+     "course_code": "C1", "room": "101", "faculty_initial": "ABC"},
+    {"day": DAY, "batch": "T-1", "start_time": "03:30 PM", "end_time": "04:45 PM",
+     "course_code": "C2", "room": "102", "faculty_initial": "ABC"},
+]
+
+
+def _at(monkeypatch, hour, minute):
+    now = SYLHET_TZ.localize(datetime(2026, 10, 18, hour, minute))
+    monkeypatch.setattr(subscriptions, '_now', lambda: (now, DAY, hour * 60 + minute))
+
+
+def _scheduler(tmp_path):
+    scheduler = NotificationScheduler(SubscriptionStore(str(tmp_path / 'state.db')))
+    fired = []
+
+    async def fan_out(events, day):
+        fired.extend(events)
+
+    scheduler.fan_out = fan_out
+    return scheduler, fired
+
+
+def test_subscribing_mid_day_skips_classes_already_started(tmp_path, data_dir, monkeypatch):
+    data_dir(routine=ROUTINE)
+    scheduler, fired = _scheduler(tmp_path)
+
+    _at(monkeypatch, 7, 0)
+    asyncio.run(scheduler._tick())
+    assert fired == []
+
+    # 2:15 PM ক্লাস শুরু হয়ে গেছে; শুধু 3:30 PM এর নোটিফিকেশন (3:20 PM এ) বাকি থাকবে
+    scheduler.store.subscribe(1, KIND_CLASS, "T-1", 10)
+    _at(monkeypatch, 14, 35)
+    asyncio.run(scheduler._tick())
+    assert fired == []
+    assert [event[5] for event in scheduler._events] == [15 * 60 + 30]
+
+    _at(monkeypatch, 15, 20)
+    asyncio.run(scheduler._tick())
+    assert [(event[0], event[3]) for event in fired] == [(15 * 60 + 20, "T-1")]
+
+
+def test_first_start_fires_events_of_the_current_minute(tmp_path, data_dir, monkeypatch):
+    data_dir(routine=ROUTINE)
+    scheduler, fired = _scheduler(tmp_path)
+    scheduler.store.subscribe(1, KIND_CLASS, "T-1", 10)
+
+    _at(monkeypatch, 14, 5)
+    asyncio.run(scheduler._tick())
+    assert [event[5] for event in fired] == [14 * 60 + 15]
@@ -0,0 +1,68 @@
+import time
+import asyncio
+
+from telegram import Update
+
+from update_processor import TrackedUpdateProcessor
+
+_ids = iter(range(1, 10 ** 6))
+
+
+def _update(text):
+    message = {"message_id": next(_ids), "date": 0, "chat": {"id": 1, "type": "private"}, "text": text}
+    if text.startswith('/'):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return Update.de_json({"update_id": message["message_id"], "message": message}, None)
+
+
+async def _flood_then_command(processor, ai_messages=30, handler_time=0.05):
+    async def handle(seconds):
+        await asyncio.sleep(seconds)
+
+    flood = [asyncio.create_task(processor.process_update(_update("আজ কি ক্লাস আছে?"), handle(handler_time)))
+             for _ in range(ai_messages)]
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await processor.process_update(_update("/bus Tilaghor"), handle(0))
+    command_time = time.perf_counter() - started
+    await asyncio.gather(*flood)
+    return command_time
+
+
+def test_command_uses_a_reserved_slot_during_an_ai_flood():
+    async def run():
+        processor = TrackedUpdateProcessor(4, reserved=1)
+        command_time = await _flood_then_command(processor)
+        assert processor.pending == processor.waiting == processor.current_concurrent_updates == 0
+        return command_time
+
+    # ৩০টি AI মেসেজ ৩টি স্লটে ~0.5 s নেয়; কমান্ড অপেক্ষা করে না
+    assert asyncio.run(run()) < 0.02
+
+
+def test_waiting_command_goes_before_waiting_ai_messages():
+    async def run():
+        processor = TrackedUpdateProcessor(4)
+        return await _flood_then_command(processor)
+
+    # সংরক্ষিত স্লট না থাকলেও কমান্ড প্রথম খালি স্লট পায় (FIFO হলে ~0.4 s)
+    assert asyncio.run(run()) < 0.1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        processor = TrackedUpdateProcessor(1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(processor.process_update(_update("/start"), release.wait()))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(processor.process_update(_update("hello"), asyncio.sleep(0)))
+        await asyncio.sleep(0)
+        assert processor.waiting == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert processor.waiting == 0
+        release.set()
+        await holder
+        assert processor.current_concurrent_updates == 0
+
+    asyncio.run(run())
@@ -0,0 +1,118 @@
+import heapq
+import asyncio
+import itertools
+from telegram import Update
+from telegram.ext import SimpleUpdateProcessor, filters
+
+# কমান্ড/ইনলাইন সার্চ আগে, তারপর Gemini তে যাওয়া সাধারণ টেক্সট
+PRIORITY_COMMAND = 0
+PRIORITY_AI = 1
+
+# main.py তে gemini_message_handler এর ফিল্টার
+AI_UPDATES = filters.TEXT & ~filters.COMMAND
+
+def update_priority(update):
+    if isinstance(update, Update) and AI_UPDATES.check_update(update):
+        return PRIORITY_AI
+    return PRIORITY_COMMAND
+
+# ==========================================================
+# concurrent_updates এর update processor, কয়টি আপডেট জমে আছে তার হিসাবসহ।
+# fetcher update_queue থেকে সাথে সাথে সব আপডেট তুলে টাস্ক বানায়, তাই জমে থাকা
+# আপডেটগুলো কিউতে নয়, এখানে স্লটের জন্য অপেক্ষা করে; qsize() তাই প্রায় সবসময় 0।
+# PTB এর FIFO semaphore এর বদলে অগ্রাধিকারসহ সারি: স্লট খালি হলে অপেক্ষমাণ কমান্ড
+# আগে পায়, আর AI টেক্সট সর্বোচ্চ max - reserved টি স্লট নিতে পারে, তাই AI এর ভিড়েও
+# reserved টি স্লট কমান্ডের জন্য খালি থাকে
+# ==========================================================
+class TrackedUpdateProcessor(SimpleUpdateProcessor):
+    def __init__(self, max_concurrent_updates, reserved=0):
+        super().__init__(max_concurrent_updates)
+        self.reserved = max(0, min(reserved, max_concurrent_updates - 1))
+        # নেওয়া হয়েছে কিন্তু শেষ হয়নি (অপেক্ষমাণ + চলমান)
+        self.pending = 0
+        self._active = 0
+        self._active_ai = 0
+        # (priority, ক্রম, future); cancel হওয়াগুলো পরে বাদ পড়ে
+        self._waiters = []
+        self._waiting = [0, 0]
+        self._order = itertools.count()
+
+    @property
+    def current_concurrent_updates(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        # স্লটের জন্য অপেক্ষমাণ আপডেট
+        return sum(self._waiting)
+
+    def _can_start(self, priority):
+        if self._active >= self.max_concurrent_updates:
+            return False
+        return priority == PRIORITY_COMMAND or self._active_ai < self.max_concurrent_updates - self.reserved
+
+    def _take(self, priority):
+        self._active += 1
+        if priority == PRIORITY_AI:
+            self._active_ai += 1
+
+    def _wake(self):
+        # সারির সামনে থেকে (কমান্ড আগে, একই অগ্রাধিকারে FIFO) যতজন শুরু করতে পারে
+        while self._waiters:
+            priority, _, waiter = self._waiters[0]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_start(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._waiting[priority] -= 1
+            self._take(priority)
+            waiter.set_result(True)
+
+    def _release(self, priority):
+        self._active -= 1
+        if priority == PRIORITY_AI:
+            self._active_ai -= 1
+        self._wake()
+
+    async def _acquire(self, priority):
+        if self._can_start(priority) and not any(self._waiting[:priority + 1]):
+            self._take(priority)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+        self._waiting[priority] += 1
+        try:
+            # _wake() স্লটটি সরাসরি এই অপেক্ষমাণকে দিয়ে দেয়
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # স্লট পাওয়ার পরপরই cancel হলে স্লটটি পরের জনকে
+                self._release(priority)
+            else:
+                waiter.cancel()
+                self._waiting[priority] -= 1
+            raise
+
+    async def process_update(self, update, coroutine):
+        priority = update_priority(update)
+        self.pending += 1
+        try:
+            try:
+                await self._acquire(priority)
+            except asyncio.CancelledError:
+                # স্লট পাওয়ার আগেই cancel: হ্যান্ডলার কখনো চলবে না
+                coroutine.close()
+                raise
+            try:
+                await self.do_process_update(update, coroutine)
+            finally:
+                self._release(priority)
+        finally:
+            self.pending -= 1
+
+def backlog(application):
+    # কিউতে থাকা + processor এ নেওয়া কিন্তু শেষ না হওয়া আপডেট
+    processor = application.update_processor
+    return application.update_queue.qsize() + getattr(processor, 'pending', 0)
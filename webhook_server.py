@@ -0,0 +1,219 @@
+import os
+import sys
+import hmac
+import json
+import signal
+import asyncio
+import logging
+import urllib.error
+import urllib.request
+from telegram import Update
+import metrics
+from update_processor import backlog
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# Webhook কনফিগারেশন (.env থেকে)
+# ==========================================================
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+# টেলিগ্রাম প্রতিটি রিকোয়েস্টে X-Telegram-Bot-Api-Secret-Token হেডারে এটি পাঠায়
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# পাবলিক URL দিলে চালু হওয়ার সময় setWebhook কল করা হয়; না দিলে শুধু লোকাল সার্ভার
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+# কিউতে থাকা + প্রসেস চলা আপডেট এর বেশি হলে 503 দেওয়া হয়, টেলিগ্রাম পরে আবার পাঠাবে
+WEBHOOK_MAX_QUEUE = int(os.getenv("WEBHOOK_MAX_QUEUE", "1000"))
+# 1 দিলে পাবলিক webhook সার্ভারেও /metrics দেখানো হয়; ডিফল্টে শুধু লোকাল METRICS_PORT এ
+WEBHOOK_METRICS = os.getenv("WEBHOOK_METRICS") == "1"
+
+MAX_BODY_SIZE = 1024 * 1024
+READ_TIMEOUT = 10
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+# ==========================================================
+# ছোট HTTP সার্ভার: প্রতি কানেকশনে একটি রিকোয়েস্ট
+# ==========================================================
+async def _read_request(reader):
+    request_line = await reader.readline()
+    parts = request_line.decode('latin-1').split()
+    if len(parts) < 2:
+        return None
+    method, path = parts[0].upper(), parts[1].split('?', 1)[0]
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_SIZE:
+        return method, path, headers, None
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+def _response(status, body=b'', content_type='text/plain; charset=utf-8'):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n"
+    )
+    return head.encode('latin-1') + body
+
+class WebhookServer:
+    def __init__(self, application, listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, path=WEBHOOK_PATH,
+                 secret_token=WEBHOOK_SECRET, max_queue=WEBHOOK_MAX_QUEUE, expose_metrics=WEBHOOK_METRICS):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.max_queue = max_queue
+        # GET রুট: path -> async function যা (status, body, content_type) ফেরত দেয়
+        self.get_routes = {'/healthz': self._health}
+        if expose_metrics:
+            self.get_routes['/metrics'] = self._metrics
+        self._server = None
+
+    async def _health(self):
+        return 200, 'ok', 'text/plain; charset=utf-8'
+
+    async def _metrics(self):
+        return 200, metrics.render(), 'text/plain; version=0.0.4; charset=utf-8'
+
+    async def _handle_update(self, headers, body):
+        if self.secret_token:
+            received = headers.get('x-telegram-bot-api-secret-token', '')
+            if not hmac.compare_digest(received.encode('utf-8'), self.secret_token.encode('utf-8')):
+                return 403
+        try:
+            payload = json.loads(body)
+        except ValueError as e:
+            logger.warning("Invalid update payload: %s", e)
+            return 400
+        # বৈধ JSON কিন্তু অবজেক্ট নয় (যেমন [1,2]) হলে de_json AttributeError দেয়
+        if not isinstance(payload, dict):
+            return 400
+        try:
+            update = Update.de_json(payload, self.application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning("Invalid update payload: %s", e)
+            return 400
+        if update is None:
+            return 400
+
+        queue = self.application.update_queue
+        # qsize() নয়: concurrent_updates এ আপডেটগুলো কিউতে নয়, processor এ অপেক্ষা করে
+        if backlog(self.application) >= self.max_queue:
+            return 503
+        queue.put_nowait(update)
+        return 200
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(_read_request(reader), READ_TIMEOUT)
+            if request is None:
+                writer.write(_response(400))
+            else:
+                method, path, headers, body = request
+                if body is None:
+                    writer.write(_response(413))
+                elif method == 'GET' and path in self.get_routes:
+                    status, content, content_type = await self.get_routes[path]()
+                    writer.write(_response(status, content, content_type))
+                elif path != self.path:
+                    writer.write(_response(404))
+                elif method != 'POST':
+                    writer.write(_response(405))
+                else:
+                    writer.write(_response(await self._handle_update(headers, body)))
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.listen, self.port)
+        logger.info("HTTP server listening on %s:%s%s", self.listen, self.port, self.path or "")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+# ==========================================================
+# webhook মোডে বট চালানো (polling এর বিকল্প)
+# ==========================================================
+async def run_webhook(application, webhook_url=WEBHOOK_URL, server=None):
+    if server is None:
+        server = WebhookServer(application)
+    if not server.secret_token:
+        logger.warning("WEBHOOK_SECRET সেট করা নেই; যে কেউ আপডেট পাঠাতে পারবে।")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await server.start()
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=server.secret_token,
+                allowed_updates=Update.ALL_TYPES,
+            )
+        print("🚀 বট webhook মোডে চালু হয়েছে! Ctrl+C চাপলে বন্ধ হবে।")
+        await stop_event.wait()
+    finally:
+        # নতুন রিকোয়েস্ট নেওয়া বন্ধ, তারপর কিউতে থাকা আপডেটগুলো শেষ করে বন্ধ
+        await server.stop()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+# ==========================================================
+# লোকাল টেস্ট: রেকর্ড করা Update JSON এন্ডপয়েন্টে পাঠানো
+# python webhook_server.py update.json [url]
+# ==========================================================
+def post_update(path, url=None, secret_token=WEBHOOK_SECRET):
+    if url is None:
+        url = f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+    with open(path, 'rb') as f:
+        body = f.read()
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': 'application/json'})
+    if secret_token:
+        request.add_header('X-Telegram-Bot-Api-Secret-Token', secret_token)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("ব্যবহার: python webhook_server.py <update.json> [url]")
+        sys.exit(1)
+    print(post_update(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))